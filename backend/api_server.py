@@ -1,9 +1,12 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
 import os
 from pathlib import Path
-from backend.database import DatabaseManager
+from backend.database import DatabaseManager, VersionConflict
+from backend.database.backup import BackupManager
 from backend.bot_manager import BotManager
+from backend.metrics import OPENMETRICS_CONTENT_TYPE, PROMETHEUS_CONTENT_TYPE, render_metrics, wants_openmetrics
+from backend.utils.timeseries import RESOLUTIONS
 <<<<<<< HEAD
 from backend.automod import AutoModManager
 =======
@@ -15,7 +18,7 @@ VERSION = "2.0.0"
 class APIServer:
     """Flask API server for Far-Bot v2.0.0"""
     
-    def __init__(self, db: DatabaseManager, bot_manager: BotManager, port: int = 5000):
+    def __init__(self, db: DatabaseManager, bot_manager: BotManager, port: int = 5000, logger=None):
         self.panel_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'panel'))
         self.app = Flask(__name__, 
                         static_folder=os.path.join(self.panel_path, 'assets'),
@@ -28,8 +31,32 @@ class APIServer:
 =======
 >>>>>>> 9cf509251284ef38bf215d47a080c5df52a9b90c
         self.port = port
+        # FarBotLogger whose in-memory tail backs /api/bots/<id>/logs
+        self.logger = logger
+        self.backups = BackupManager(db.db_path, db=db)
         self._setup_routes()
     
+    @staticmethod
+    def _expected_version():
+        """Parse the If-Match header into a record version (None when absent or '*')"""
+        header = request.headers.get('If-Match')
+        if not header or header.strip() == '*':
+            return None
+        tag = header.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        if not tag.isdigit():
+            raise ValueError(f"Invalid If-Match header: {header}")
+        return int(tag)
+    
+    @staticmethod
+    def _conflict(e: VersionConflict):
+        return jsonify({
+            "error": "The record was modified by someone else",
+            "current_version": e.current
+        }), 412
+    
     def _setup_routes(self):
         """Setup Flask routes"""
         
@@ -116,7 +143,9 @@ class APIServer:
                 bot['is_running'] = self.bot_manager.is_bot_running(bot_id)
                 commands = self.db.get_commands(bot_id)
                 bot['command_count'] = len(commands) if commands else 0
-                return jsonify(bot)
+                response = jsonify(bot)
+                response.headers['ETag'] = f'"{bot.get("version", 0)}"'
+                return response
             return jsonify({"error": "Bot not found"}), 404
         
         @self.app.route('/api/bots', methods=['POST'])
@@ -163,17 +192,40 @@ class APIServer:
         @self.app.route('/api/bots/<bot_id>', methods=['PUT'])
         def update_bot(bot_id):
             data = request.json
-            if self.db.update_bot(bot_id, data):
-                return jsonify({"success": True})
+            try:
+                version = self.db.update_bot(bot_id, data, self._expected_version())
+                if version:
+                    response = jsonify({"success": True, "version": version})
+                    response.headers['ETag'] = f'"{version}"'
+                    return response
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            except VersionConflict as e:
+                return self._conflict(e)
             return jsonify({"error": "Failed to update bot"}), 500
         
         @self.app.route('/api/bots/<bot_id>', methods=['DELETE'])
         def delete_bot(bot_id):
-            if self.bot_manager.is_bot_running(bot_id):
-                self.bot_manager.stop_bot(bot_id)
-            
-            if self.db.delete_bot(bot_id):
-                return jsonify({"success": True})
+            try:
+                expected = self._expected_version()
+                # Check before stopping so a stale delete leaves the bot running
+                if expected is not None:
+                    bot = self.db.get_bot(bot_id)
+                    current = bot.get("version", 0) if bot else None
+                    if current != expected:
+                        raise VersionConflict(expected, current)
+                
+                if self.bot_manager.is_bot_running(bot_id):
+                    self.bot_manager.stop_bot(bot_id)
+                
+                if self.db.delete_bot(bot_id, expected):
+                    self.bot_manager.stats.forget_bot(bot_id)
+                    self.bot_manager.errors.clear(bot_id)
+                    return jsonify({"success": True})
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            except VersionConflict as e:
+                return self._conflict(e)
             return jsonify({"error": "Failed to delete bot"}), 500
         
         @self.app.route('/api/bots/<bot_id>/start', methods=['POST'])
@@ -327,15 +379,31 @@ class APIServer:
                 if not valid:
                     return jsonify({"error": msg}), 400
             
-            if self.db.update_command(bot_id, cmd_id, data):
+            try:
+                version = self.db.update_command(bot_id, cmd_id, data, self._expected_version())
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            except VersionConflict as e:
+                return self._conflict(e)
+            
+            if version:
                 if self.bot_manager.is_bot_running(bot_id):
                     self.bot_manager.reload_commands(bot_id)
-                return jsonify({"success": True})
+                response = jsonify({"success": True, "version": version})
+                response.headers['ETag'] = f'"{version}"'
+                return response
             return jsonify({"error": "Failed to update command"}), 500
         
         @self.app.route('/api/bots/<bot_id>/commands/<cmd_id>', methods=['DELETE'])
         def delete_command(bot_id, cmd_id):
-            if self.db.delete_command(bot_id, cmd_id):
+            try:
+                deleted = self.db.delete_command(bot_id, cmd_id, self._expected_version())
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            except VersionConflict as e:
+                return self._conflict(e)
+            
+            if deleted:
                 if self.bot_manager.is_bot_running(bot_id):
                     self.bot_manager.reload_commands(bot_id)
                 return jsonify({"success": True})
@@ -349,13 +417,27 @@ class APIServer:
             added = 0
             errors = []
             
-            for cmd in commands:
-                cmd_id = cmd.get('id', cmd.get('trigger', '')).lower().replace(' ', '_')
-                if cmd_id:
-                    if self.db.add_command(bot_id, cmd_id, cmd):
+            # One load and one atomic write for the whole request; invalid entries are skipped and reported
+            try:
+                with self.db.batch(bot_id) as tx:
+                    for index, cmd in enumerate(commands):
+                        if not isinstance(cmd, dict):
+                            errors.append({"index": index, "error": "Command must be an object"})
+                            continue
+                        cmd_id = cmd.get('id', cmd.get('trigger', ''))
+                        cmd_id = cmd_id.lower().replace(' ', '_') if isinstance(cmd_id, str) else ''
+                        if not cmd_id:
+                            errors.append({"index": index, "error": "Command ID/trigger required"})
+                            continue
+                        valid, msg = Validator.validate_command_name(cmd_id)
+                        if not valid:
+                            errors.append({"index": index, "id": cmd_id, "error": msg})
+                            continue
+                        tx.add_command(cmd_id, cmd)
                         added += 1
-                    else:
-                        errors.append(cmd_id)
+            except Exception as e:
+                print(f"[API] Bulk add failed for {bot_id}: {e}")
+                return jsonify({"error": "Failed to add commands"}), 500
             
             if self.bot_manager.is_bot_running(bot_id):
                 self.bot_manager.reload_commands(bot_id)
@@ -366,6 +448,12 @@ class APIServer:
                 "errors": errors
             }), 201
         
+        @self.app.route('/api/bots/<bot_id>/changes', methods=['GET'])
+        def get_changes(bot_id):
+            since = request.args.get('since', 0, type=int)
+            epoch = request.args.get('epoch')
+            return jsonify(self.db.changes_since(bot_id, since, epoch))
+        
 <<<<<<< HEAD
         # ==================== AUTOMOD ENDPOINTS ====================
         @self.app.route('/api/bots/<bot_id>/automod/<guild_id>', methods=['GET'])
@@ -414,6 +502,87 @@ class APIServer:
         @self.app.route('/api/version', methods=['GET'])
         def get_version():
             return jsonify({"version": VERSION, "name": "Far-Bot"})
+        
+        @self.app.route('/api/bots/<bot_id>/stats', methods=['GET'])
+        def get_bot_stats(bot_id):
+            return jsonify({
+                **self.bot_manager.stats.get_summary(bot_id),
+                "running": self.bot_manager.is_bot_running(bot_id)
+            })
+        
+        @self.app.route('/api/bots/<bot_id>/logs', methods=['GET'])
+        def get_bot_logs(bot_id):
+            if self.logger is None:
+                return jsonify([])
+            limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+            return jsonify(self.logger.get_logs(limit, request.args.get('level'), bot_id))
+        
+        @self.app.route('/api/bots/<bot_id>/errors', methods=['GET'])
+        def get_bot_errors(bot_id):
+            return jsonify(self.bot_manager.errors.get_groups(bot_id))
+        
+        @self.app.route('/api/bots/<bot_id>/errors', methods=['DELETE'])
+        def clear_bot_errors(bot_id):
+            self.bot_manager.errors.clear(bot_id)
+            return jsonify({"success": True})
+        
+        @self.app.route('/api/bots/<bot_id>/latency', methods=['GET'])
+        def get_bot_latency(bot_id):
+            return jsonify(self.bot_manager.stats.get_latency(bot_id))
+        
+        @self.app.route('/api/bots/<bot_id>/activity', methods=['GET'])
+        def get_bot_activity(bot_id):
+            resolution = request.args.get('resolution', 'minute')
+            if resolution not in RESOLUTIONS:
+                return jsonify({"error": f"resolution must be one of: {', '.join(RESOLUTIONS)}"}), 400
+            return jsonify(self.bot_manager.stats.get_activity(
+                bot_id, resolution, request.args.get('buckets', type=int), request.args.get('command')
+            ))
+        
+        @self.app.route('/api/bots/<bot_id>/top', methods=['GET'])
+        def get_bot_top(bot_id):
+            guild_id = request.args.get('guild')
+            limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+            return jsonify(self.bot_manager.stats.get_top(bot_id, guild_id, limit))
+        
+        @self.app.route('/api/bots/<bot_id>/unique-users', methods=['GET'])
+        def get_unique_users(bot_id):
+            days = min(max(request.args.get('days', 1, type=int), 1), 366)
+            return jsonify(self.bot_manager.stats.get_unique_users(
+                bot_id, days, request.args.get('guild'), request.args.get('command')
+            ))
+        
+        @self.app.route('/api/stats/latency', methods=['GET'])
+        def get_fleet_latency():
+            return jsonify(self.bot_manager.stats.get_fleet_latency())
+        
+        @self.app.route('/metrics', methods=['GET'])
+        def metrics():
+            openmetrics = wants_openmetrics(request.headers.get('Accept'))
+            return Response(
+                render_metrics(self.db, self.bot_manager, openmetrics),
+                content_type=OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE
+            )
+        
+        @self.app.route('/api/storage/stats', methods=['GET'])
+        def get_storage_stats():
+            return jsonify({
+                **self.db.get_cache_stats(),
+                "catalog_sizes": self.db.get_resident_sizes()
+            })
+        
+        @self.app.route('/api/backups', methods=['GET'])
+        def list_backups():
+            return jsonify(self.backups.list_backups())
+        
+        @self.app.route('/api/backups', methods=['POST'])
+        def create_backup():
+            # Restores run offline through `python -m backend.database.backup restore`
+            try:
+                return jsonify({"success": True, **self.backups.create_backup()}), 201
+            except Exception as e:
+                print(f"[API] Backup failed: {e}")
+                return jsonify({"error": "Failed to create backup"}), 500
     
     def run(self, debug: bool = False):
         """Run the Flask server"""
@@ -3,12 +3,13 @@ Auto Moderation Module for Far-Bot v2.0.0
 Handles welcome/goodbye messages, auto-roles, and server configurations
 """
 
-import json
 import os
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 import discord
 
+from backend.utils.json_codec import codec
+
 
 class AutoModManager:
     """Manages auto-moderation features like welcome/goodbye messages"""
@@ -130,17 +131,16 @@ class AutoModManager:
         
         if os.path.exists(config_file):
             try:
-                with open(config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    # Merge with defaults for any missing keys
-                    for key, value in self.DEFAULT_CONFIG.items():
-                        if key not in config:
-                            config[key] = value
-                        elif isinstance(value, dict):
-                            for subkey, subvalue in value.items():
-                                if subkey not in config[key]:
-                                    config[key][subkey] = subvalue
-                    return config
+                config = codec.load_file(config_file)
+                # Merge with defaults for any missing keys
+                for key, value in self.DEFAULT_CONFIG.items():
+                    if key not in config:
+                        config[key] = value
+                    elif isinstance(value, dict):
+                        for subkey, subvalue in value.items():
+                            if subkey not in config[key]:
+                                config[key][subkey] = subvalue
+                return config
             except Exception as e:
                 print(f"[AutoMod] Error loading config: {e}")
         
@@ -151,8 +151,10 @@ class AutoModManager:
         config_file = self._get_config_file(bot_id, guild_id)
         
         try:
-            with open(config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
+            # Replace atomically so readers and backups never see a half-written file
+            tmp_file = config_file + ".tmp"
+            codec.dump_file(tmp_file, config, pretty=True)
+            os.replace(tmp_file, config_file)
             return True
         except Exception as e:
             print(f"[AutoMod] Error saving config: {e}")
@@ -6,6 +6,8 @@ import discord
 from discord.ext import commands
 from backend.database import DatabaseManager
 from backend.command_executor import CommandExecutor, BotInstance
+from backend.error_tracker import ErrorTracker
+from backend.stats_tracker import StatsTracker
 import threading
 import time
 
@@ -14,12 +16,16 @@ VERSION = "2.0.0"
 class BotManager:
     """Manages Discord bot instances - v2.0.0"""
     
-    def __init__(self, db: DatabaseManager):
+    def __init__(self, db: DatabaseManager, logger=None):
         self.db = db
+        # FarBotLogger that bots write their lifecycle events and errors to
+        self.logger = logger
         self.active_bots: Dict[str, BotInstance] = {}
         self.bot_tasks: Dict[str, asyncio.Task] = {}
         self.bot_loops: Dict[str, asyncio.AbstractEventLoop] = {}
         self.bot_threads: Dict[str, threading.Thread] = {}
+        # (epoch, revision) of the commands each running bot has loaded
+        self.command_revisions: Dict[str, tuple] = {}
         self.callbacks: Dict[str, list] = {
             "bot_started": [],
             "bot_stopped": [],
@@ -27,6 +33,8 @@ class BotManager:
             "error": []
         }
         self.executor = CommandExecutor()
+        self.stats = StatsTracker(db)
+        self.errors = ErrorTracker(db.settings.get("error_groups_per_bot", 50))
     
     def register_callback(self, event: str, callback: Callable):
         """Register a callback for an event"""
@@ -81,9 +89,12 @@ class BotManager:
             print(f"[BotManager] Creating bot instance for {bot_id}")
             
             # Create bot instance
-            bot_instance = BotInstance(bot_id, token, prefix)
+            bot_instance = BotInstance(bot_id, token, prefix, db=self.db, stats=self.stats, logger=self.logger,
+                                       errors=self.errors)
             
-            # Load commands from database
+            # Load commands from database; take the revision first so no later change is missed
+            self.db.pin_bot(bot_id)
+            self.command_revisions[bot_id] = (self.db.epoch, self.db.get_revision(bot_id))
             commands_data = self.db.get_commands(bot_id)
             print(f"[BotManager] Loading {len(commands_data)} commands for {bot_id}")
             
@@ -115,6 +126,7 @@ class BotManager:
             return {"success": True, "message": f"Bot {bot_id} started", "commands_loaded": loaded}
         except Exception as e:
             print(f"[BotManager] Error starting bot: {e}")
+            self.db.unpin_bot(bot_id)
             if bot_id in self.active_bots:
                 del self.active_bots[bot_id]
             return {"success": False, "error": str(e)}
@@ -137,34 +149,53 @@ class BotManager:
                     print(f"[BotManager] Error stopping bot gracefully: {e}")
             
             del self.active_bots[bot_id]
+            self.command_revisions.pop(bot_id, None)
+            self.db.unpin_bot(bot_id)
             
             # Update bot status
             self.db.update_bot(bot_id, {"status": "stopped"})
             
             print(f"[BotManager] Bot {bot_id} stopped")
+            if self.logger:
+                self.logger.info("Bot stopped", bot_id)
             return {"success": True, "message": f"Bot {bot_id} stopped"}
         except Exception as e:
             print(f"[BotManager] Error stopping bot: {e}")
             # Force remove if graceful stop fails
+            self.db.unpin_bot(bot_id)
             if bot_id in self.active_bots:
                 del self.active_bots[bot_id]
             return {"success": True, "message": f"Bot {bot_id} stopped (forced)"}
     
     def reload_commands(self, bot_id: str) -> Dict:
-        """Reload commands for a running bot"""
+        """Reload commands for a running bot, only touching what changed when possible"""
         try:
             if bot_id not in self.active_bots:
                 return {"success": False, "error": "Bot not running"}
             
             bot_instance = self.active_bots[bot_id]
+            epoch, revision = self.command_revisions.get(bot_id, (None, 0))
+            feed = self.db.changes_since(bot_id, revision, epoch)
             commands_data = self.db.get_commands(bot_id)
             
-            print(f"[BotManager] Reloading {len(commands_data)} commands for {bot_id}")
-            
-            # Reload commands
-            bot_instance.reload_commands(commands_data)
-            
-            return {"success": True, "message": f"Commands reloaded for {bot_id}"}
+            changed = {}
+            full = feed["full"]
+            for change in feed["changes"]:
+                if change["op"] == "reload":
+                    full = True
+                elif change["command_id"] is not None:
+                    changed[change["command_id"]] = commands_data.get(change["command_id"])
+            
+            if not full and bot_instance.apply_command_changes(changed):
+                print(f"[BotManager] Reloaded {len(changed)} changed commands for {bot_id}")
+                mode = "incremental"
+            else:
+                print(f"[BotManager] Reloading {len(commands_data)} commands for {bot_id}")
+                bot_instance.reload_commands(commands_data)
+                mode = "full"
+            self.command_revisions[bot_id] = (feed["epoch"], feed["revision"])
+            
+            return {"success": True, "message": f"Commands reloaded for {bot_id}", "mode": mode}
         except Exception as e:
             print(f"[BotManager] Error reloading commands: {e}")
             return {"success": False, "error": str(e)}
@@ -1,13 +1,71 @@
 import asyncio
-import re
+import random
+import time
 from typing import Dict, Optional, Any
 from discord.ext import commands
 from discord import app_commands
 import discord
 from datetime import datetime
+from backend.database.async_manager import AsyncDatabaseManager
+from backend.error_tracker import ErrorTracker
+from backend.logger import BotLogger
+from backend.utils.template import Template, compile_template
 
 VERSION = "2.0.0"
 
+
+def _guild_value(getter, dm_value: str):
+    return lambda ctx, now: getter(ctx.guild) if ctx.guild else dm_value
+
+
+# Variables available in simple command responses: name -> (ctx, now) -> str.
+# $args, $argN and $random(min,max) are handled by the template itself.
+SIMPLE_VARIABLES = {
+    # User variables
+    'username': lambda ctx, now: ctx.author.name,
+    'user': lambda ctx, now: ctx.author.name,
+    'userid': lambda ctx, now: str(ctx.author.id),
+    'mention': lambda ctx, now: ctx.author.mention,
+    'usermention': lambda ctx, now: ctx.author.mention,
+    'discriminator': lambda ctx, now: ctx.author.discriminator,
+    'avatar': lambda ctx, now: str(ctx.author.avatar.url if ctx.author.avatar else ''),
+    'displayname': lambda ctx, now: ctx.author.display_name,
+    
+    # Server variables
+    'servername': _guild_value(lambda guild: guild.name, 'DM'),
+    'server': _guild_value(lambda guild: guild.name, 'DM'),
+    'serverid': _guild_value(lambda guild: str(guild.id), 'DM'),
+    'membercount': _guild_value(lambda guild: str(guild.member_count), '1'),
+    'members': _guild_value(lambda guild: str(guild.member_count), '1'),
+    'servericon': _guild_value(lambda guild: str(guild.icon.url if guild.icon else ''), ''),
+    
+    # Channel variables
+    'channel': lambda ctx, now: ctx.channel.name if hasattr(ctx.channel, 'name') else 'DM',
+    'channelid': lambda ctx, now: str(ctx.channel.id),
+    'channelmention': lambda ctx, now: ctx.channel.mention if hasattr(ctx.channel, 'mention') else 'DM',
+    
+    # Bot variables
+    'botname': lambda ctx, now: ctx.bot.user.name,
+    'bot': lambda ctx, now: ctx.bot.user.name,
+    'botmention': lambda ctx, now: ctx.bot.user.mention,
+    'botid': lambda ctx, now: str(ctx.bot.user.id),
+    'prefix': lambda ctx, now: ctx.prefix,
+    
+    # Time variables
+    'time': lambda ctx, now: now.strftime('%H:%M:%S'),
+    'date': lambda ctx, now: now.strftime('%Y-%m-%d'),
+    'datetime': lambda ctx, now: now.strftime('%Y-%m-%d %H:%M:%S'),
+    'day': lambda ctx, now: now.strftime('%A'),
+    'month': lambda ctx, now: now.strftime('%B'),
+    'year': lambda ctx, now: str(now.year),
+    
+    # Random number (for fun commands), the same for every $random in a response
+    'random': lambda ctx, now: str(random.randint(1, 100)),
+    
+    # All arguments, filled in by CommandExecutor.render_response
+    'args': None,
+}
+
 class CommandExecutor:
     """Executes and manages bot commands - v2.0.0"""
     
@@ -15,71 +73,30 @@ class CommandExecutor:
         self.custom_commands = {}
         self.execution_history = []
     
-    async def execute_simple_command(self, ctx, response: str) -> str:
-        """Execute a simple command with variable replacement"""
+    def compile_response(self, response: str) -> Template:
+        """Compile a simple command response once, at registration"""
+        return compile_template(response, SIMPLE_VARIABLES)
+    
+    def render_response(self, ctx, template: Template) -> str:
+        """Fill a compiled response, computing only the variables it uses"""
+        if template.static:
+            return template.source
+        now = datetime.now()
+        args = ctx.message.content.split()[1:] if template.uses_args or 'args' in template.names else ()
+        values = {}
+        for name in template.names:
+            values[name] = ' '.join(args) if name == 'args' else SIMPLE_VARIABLES[name](ctx, now)
+        return template.render(values, args)
+    
+    async def execute_simple_command(self, ctx, response) -> str:
+        """Execute a simple command with variable replacement
+        
+        `response` is the Template compiled by CommandBuilder; a plain string
+        is compiled on the spot.
+        """
         try:
-            result = response
-            
-            # User variables
-            result = result.replace('$username', ctx.author.name)
-            result = result.replace('$user', ctx.author.name)
-            result = result.replace('$userid', str(ctx.author.id))
-            result = result.replace('$mention', ctx.author.mention)
-            result = result.replace('$usermention', ctx.author.mention)
-            result = result.replace('$discriminator', ctx.author.discriminator)
-            result = result.replace('$avatar', str(ctx.author.avatar.url if ctx.author.avatar else ''))
-            result = result.replace('$displayname', ctx.author.display_name)
-            
-            # Server variables
-            if ctx.guild:
-                result = result.replace('$servername', ctx.guild.name)
-                result = result.replace('$server', ctx.guild.name)
-                result = result.replace('$serverid', str(ctx.guild.id))
-                result = result.replace('$membercount', str(ctx.guild.member_count))
-                result = result.replace('$members', str(ctx.guild.member_count))
-                result = result.replace('$servericon', str(ctx.guild.icon.url if ctx.guild.icon else ''))
-            else:
-                result = result.replace('$servername', 'DM')
-                result = result.replace('$server', 'DM')
-                result = result.replace('$serverid', 'DM')
-                result = result.replace('$membercount', '1')
-                result = result.replace('$members', '1')
-                result = result.replace('$servericon', '')
-            
-            # Channel variables
-            result = result.replace('$channel', ctx.channel.name if hasattr(ctx.channel, 'name') else 'DM')
-            result = result.replace('$channelid', str(ctx.channel.id))
-            result = result.replace('$channelmention', ctx.channel.mention if hasattr(ctx.channel, 'mention') else 'DM')
-            
-            # Bot variables
-            result = result.replace('$botname', ctx.bot.user.name)
-            result = result.replace('$bot', ctx.bot.user.name)
-            result = result.replace('$botmention', ctx.bot.user.mention)
-            result = result.replace('$botid', str(ctx.bot.user.id))
-            result = result.replace('$prefix', ctx.prefix)
-            
-            # Time variables
-            now = datetime.now()
-            result = result.replace('$time', now.strftime('%H:%M:%S'))
-            result = result.replace('$date', now.strftime('%Y-%m-%d'))
-            result = result.replace('$datetime', now.strftime('%Y-%m-%d %H:%M:%S'))
-            result = result.replace('$day', now.strftime('%A'))
-            result = result.replace('$month', now.strftime('%B'))
-            result = result.replace('$year', str(now.year))
-            
-            # Random number (for fun commands)
-            import random
-            result = re.sub(r'\$random$$(\d+),(\d+)$$', 
-                          lambda m: str(random.randint(int(m.group(1)), int(m.group(2)))), 
-                          result)
-            result = result.replace('$random', str(random.randint(1, 100)))
-            
-            # Arguments (if any)
-            args = ctx.message.content.split()[1:]  # Skip the command itself
-            result = result.replace('$args', ' '.join(args))
-            for i, arg in enumerate(args):
-                result = result.replace(f'$arg{i+1}', arg)
-            
+            template = response if isinstance(response, Template) else self.compile_response(response)
+            result = self.render_response(ctx, template)
             await ctx.send(result)
             return result
         except Exception as e:
@@ -121,9 +138,11 @@ class CommandExecutor:
 class CommandBuilder:
     """Builds and registers commands dynamically - v2.0.0"""
     
-    def __init__(self, bot: commands.Bot, executor: CommandExecutor):
+    def __init__(self, bot: commands.Bot, executor: CommandExecutor, db=None):
         self.bot = bot
         self.executor = executor
+        # AsyncDatabaseManager exposed to user code as `db`
+        self.db = db
         self.registered_commands = {}
         self.registered_slash_commands = {}
     
@@ -134,9 +153,12 @@ class CommandBuilder:
             if trigger in self.registered_commands:
                 self.bot.remove_command(trigger)
             
-            # Create the command function
-            async def simple_cmd(ctx, response=response):
-                await self.executor.execute_simple_command(ctx, response)
+            # Compile the response once; the closure keeps it out of the
+            # command's signature so discord.py doesn't parse it as an argument
+            template = self.executor.compile_response(response)
+            
+            async def simple_cmd(ctx):
+                await self.executor.execute_simple_command(ctx, template)
             
             # Set function name for discord.py
             simple_cmd.__name__ = trigger
@@ -168,6 +190,7 @@ class CommandBuilder:
                 'discord': discord,
                 'asyncio': asyncio,
                 'datetime': datetime,
+                'db': self.db,
             }
             exec(code, exec_globals)
             print(f"[CommandBuilder] Advanced command registered successfully")
@@ -193,6 +216,7 @@ class CommandBuilder:
                 'asyncio': asyncio,
                 'datetime': datetime,
                 'app_commands': app_commands,
+                'db': self.db,
             }
             exec(code, exec_globals)
             
@@ -234,7 +258,8 @@ class CommandBuilder:
 class BotInstance:
     """Wrapper for a Discord bot instance with command management - v2.0.0"""
     
-    def __init__(self, bot_id: str, token: str, prefix: str = "!"):
+    def __init__(self, bot_id: str, token: str, prefix: str = "!", db=None, stats=None, logger=None,
+                 errors: Optional[ErrorTracker] = None):
         self.bot_id = bot_id
         self.token = token
         self.prefix = prefix
@@ -244,11 +269,22 @@ class BotInstance:
         self.intents.guilds = True
         self.bot = commands.Bot(command_prefix=prefix, intents=self.intents)
         self.executor = CommandExecutor()
-        self.builder = CommandBuilder(self.bot, self.executor)
+        # The facade is bound to this bot's event loop, so each instance gets its own
+        self.db = AsyncDatabaseManager(db) if db is not None else None
+        self.builder = CommandBuilder(self.bot, self.executor, self.db)
+        # cmd_id -> (type, trigger) of every loaded command, for incremental reloads
+        self.loaded_commands: Dict[str, tuple] = {}
         self.is_running = False
         self.is_ready = False
         self.last_error = None
         self.guilds_info = []
+        # StatsTracker shared by every bot; counting is in memory only
+        self.stats = stats
+        # How late the event loop last woke up a timer, in seconds
+        self.loop_lag = 0.0
+        self.log = BotLogger(bot_id, logger) if logger else None
+        # Command errors grouped by fingerprint; shared by every bot
+        self.errors = errors
         self._setup_events()
     
     def _setup_events(self):
@@ -270,6 +306,8 @@ class BotInstance:
                 })
             
             print(f"[Bot] Connected to {len(self.guilds_info)} servers")
+            if self.log:
+                self.log.success(f"Ready as {self.bot.user} in {len(self.guilds_info)} servers")
             
             # Sync slash commands
             try:
@@ -280,8 +318,13 @@ class BotInstance:
         @self.bot.event
         async def on_command_error(ctx, error):
             error_msg = str(error)
-            print(f"[Bot] Command error: {error_msg}")
             self.last_error = error_msg
+            if not isinstance(error, commands.CommandNotFound):
+                command = ctx.command.qualified_name if ctx.command else None
+                if self.stats:
+                    self.stats.increment_error_count(self.bot_id, command)
+                    self._record_latency(ctx)
+                self._report_error(error, command, f"Command '{ctx.invoked_with}' failed")
             
             if isinstance(error, commands.CommandNotFound):
                 # Don't send message for unknown commands
@@ -302,18 +345,93 @@ class BotInstance:
                 except:
                     pass
         
+        @self.bot.tree.error
+        async def on_app_command_error(interaction, error):
+            command = interaction.command.qualified_name if interaction.command else None
+            self.last_error = str(error)
+            if self.stats:
+                self.stats.increment_error_count(self.bot_id, command)
+            self._report_error(error, command, f"Slash command '{command}' failed")
+        
         @self.bot.event
         async def on_disconnect():
             print(f"[Bot] {self.bot_id} disconnected")
             self.is_running = False
+            if self.log:
+                self.log.warning("Disconnected from Discord")
         
         @self.bot.event
         async def on_resumed():
             print(f"[Bot] {self.bot_id} resumed")
             self.is_running = True
+            if self.log:
+                self.log.info("Session resumed")
+        
+        # Listeners rather than events, so user code defining the same events keeps working
+        async def start_timer(ctx):
+            ctx.far_bot_started = time.perf_counter()
+            if self.stats:
+                self.stats.record_dispatch(
+                    self.bot_id, str(ctx.guild.id) if ctx.guild else None,
+                    ctx.command.qualified_name, str(ctx.author.id), str(ctx.channel.id)
+                )
+        
+        async def track_app_command(interaction):
+            if self.stats and interaction.type == discord.InteractionType.application_command:
+                self.stats.record_dispatch(
+                    self.bot_id, str(interaction.guild_id) if interaction.guild_id else None,
+                    interaction.data.get('name', '?'), str(interaction.user.id), str(interaction.channel_id)
+                )
+        
+        async def count_command(ctx):
+            if self.stats:
+                self.stats.increment_command_count(self.bot_id, ctx.command.qualified_name)
+                self._record_latency(ctx)
+        
+        async def count_app_command(interaction, command):
+            if self.stats:
+                self.stats.increment_command_count(self.bot_id, command.qualified_name)
+                # No hook runs before a slash command, so measure from when Discord created the interaction
+                elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+                self.stats.record_latency(self.bot_id, command.qualified_name, max(elapsed, 0.0))
+        
+        async def count_message(message):
+            if self.stats:
+                self.stats.record_message(self.bot_id)
+        
+        self.bot.add_listener(start_timer, 'on_command')
+        self.bot.add_listener(count_command, 'on_command_completion')
+        self.bot.add_listener(count_app_command, 'on_app_command_completion')
+        self.bot.add_listener(track_app_command, 'on_interaction')
+        self.bot.add_listener(count_message, 'on_message')
+    
+    def _report_error(self, error: Exception, command: Optional[str], context: str):
+        """Group an error and log it, skipping most repeats of a known group"""
+        group = self.errors.record(self.bot_id, error, command) if self.errors else None
+        if group is not None and not ErrorTracker.should_log(group["count"]):
+            return
+        repeat = f" (seen {group['count']} times)" if group and group["count"] > 1 else ""
+        print(f"[Bot] {context}: {error}{repeat}")
+        if self.log:
+            self.log.error(f"{context}: {error}{repeat}")
+    
+    def _record_latency(self, ctx):
+        """Record how long a prefix command took, if it got as far as being invoked"""
+        started = getattr(ctx, 'far_bot_started', None)
+        if started is not None and ctx.command is not None:
+            self.stats.record_latency(self.bot_id, ctx.command.qualified_name, time.perf_counter() - started)
+    
+    async def _watch_loop_lag(self, interval: float = 1.0):
+        """Measure how far behind schedule the event loop runs a timer"""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            self.loop_lag = max(loop.time() - expected, 0.0)
     
     async def start(self) -> bool:
         """Start the bot"""
+        lag_task = asyncio.ensure_future(self._watch_loop_lag())
         try:
             print(f"[BotInstance] Starting bot {self.bot_id}...")
             await self.bot.start(self.token)
@@ -321,11 +439,17 @@ class BotInstance:
         except discord.LoginFailure as e:
             self.last_error = "Invalid token"
             print(f"[BotInstance] Invalid token for bot {self.bot_id}")
+            if self.log:
+                self.log.error("Invalid token")
             return False
         except Exception as e:
             self.last_error = str(e)
             print(f"[BotInstance] Failed to start bot {self.bot_id}: {e}")
+            if self.log:
+                self.log.error(f"Failed to start: {e}")
             return False
+        finally:
+            lag_task.cancel()
     
     async def stop(self) -> bool:
         """Stop the bot"""
@@ -344,6 +468,7 @@ class BotInstance:
             cmd_type = cmd_data.get('type', 'simple')
             trigger = cmd_data.get('trigger', cmd_id)
             
+            self.loaded_commands[cmd_id] = (cmd_type, trigger)
             if not cmd_data.get('enabled', True):
                 print(f"[BotInstance] Command {cmd_id} is disabled, skipping")
                 return True
@@ -377,5 +502,27 @@ class BotInstance:
     def reload_commands(self, commands_data: Dict[str, Any]):
         """Reload all commands"""
         self.builder.clear_commands()
+        self.loaded_commands.clear()
         for cmd_id, cmd_data in commands_data.items():
             self.add_command(cmd_id, cmd_data)
+    
+    def apply_command_changes(self, changed: Dict[str, Optional[Dict[str, Any]]]) -> bool:
+        """Reload only the given commands (None means deleted)
+        
+        Only simple commands can be swapped one by one; advanced and slash
+        code registers whatever it likes, so those return False and the
+        caller falls back to reload_commands.
+        """
+        for cmd_id, cmd_data in changed.items():
+            old_type = self.loaded_commands.get(cmd_id, ('simple',))[0]
+            new_type = cmd_data.get('type', 'simple') if cmd_data else 'simple'
+            if old_type != 'simple' or new_type != 'simple':
+                return False
+        
+        for cmd_id, cmd_data in changed.items():
+            old = self.loaded_commands.pop(cmd_id, None)
+            if old:
+                self.builder.remove_command(old[1])
+            if cmd_data is not None:
+                self.add_command(cmd_id, cmd_data)
+        return True
@@ -1,3 +1,6 @@
+import atexit
+import threading
+from collections import Counter
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 from backend.database import DatabaseManager
@@ -7,10 +10,23 @@ from backend.commands.advanced_builder import AdvancedCommandBuilder, CommandTem
 class CommandManager:
     """Manage all bot commands with improved error handling and validation"""
     
-    def __init__(self, db: DatabaseManager):
+    def __init__(self, db: DatabaseManager, usage_flush_interval: Optional[float] = None):
         self.db = db
         self.simple_builder = SimpleCommandBuilder()
         self.advanced_builder = AdvancedCommandBuilder()
+        
+        # bot_id -> command_id -> uses not yet written to the store
+        self._pending_usage: Dict[str, Counter] = {}
+        self._usage_lock = threading.Lock()
+        # Held while counts move from the buffer to the store, so readers never see them in neither place
+        self._usage_flush_lock = threading.Lock()
+        if usage_flush_interval is None:
+            usage_flush_interval = db.settings.get("usage_flush_interval", 10)
+        self.usage_flush_interval = usage_flush_interval
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+        atexit.register(self.flush_usage)
     
     def create_command(self, bot_id: str, command_data: Dict[str, Any]) -> Tuple[bool, str]:
         """Create a command (simple or advanced) with unified interface"""
@@ -42,8 +58,7 @@ class CommandManager:
         cmd_data = SimpleCommandBuilder.create_command(trigger, response, description)
         
         # Check if command already exists
-        existing = self.db.get_commands(bot_id)
-        if trigger in existing:
+        if self.db.get_command(bot_id, trigger) is not None:
             return False, f"El comando '{trigger}' ya existe. Usa actualizar en su lugar."
         
         # Save to database
@@ -63,8 +78,7 @@ class CommandManager:
         cmd_data = AdvancedCommandBuilder.create_command(code, description, name)
         
         # Check if command already exists
-        existing = self.db.get_commands(bot_id)
-        if name in existing:
+        if self.db.get_command(bot_id, name) is not None:
             return False, f"El comando '{name}' ya existe. Usa actualizar en su lugar."
         
         # Save to database
@@ -74,8 +88,7 @@ class CommandManager:
     
     def get_command(self, bot_id: str, command_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific command by ID"""
-        commands = self.db.get_commands(bot_id)
-        return commands.get(command_id)
+        return self.db.get_command(bot_id, command_id)
     
     def list_commands(self, bot_id: str) -> Dict[str, Any]:
         """List all commands for a bot"""
@@ -143,12 +156,16 @@ class CommandManager:
     
     def get_command_stats(self, bot_id: str) -> Dict[str, Any]:
         """Get statistics about commands for a bot"""
-        commands = self.list_commands(bot_id)
+        # Read together with the buffer, so counts being flushed are not missed or counted twice
+        with self._usage_flush_lock:
+            commands = self.list_commands(bot_id)
+            pending = self.get_pending_usage(bot_id)
         
         simple_count = sum(1 for c in commands.values() if c.get('type') == 'simple')
         advanced_count = sum(1 for c in commands.values() if c.get('type') == 'advanced')
         enabled_count = sum(1 for c in commands.values() if c.get('enabled', True))
-        total_usage = sum(c.get('usage_count', 0) for c in commands.values())
+        # Persisted counts plus the uses still waiting for the next flush
+        total_usage = sum(c.get('usage_count', 0) + pending.get(cmd_id, 0) for cmd_id, c in commands.items())
         
         return {
             'total': len(commands),
@@ -160,13 +177,42 @@ class CommandManager:
         }
     
     def increment_usage(self, bot_id: str, command_id: str) -> bool:
-        """Increment usage counter for a command"""
-        cmd = self.get_command(bot_id, command_id)
-        if cmd:
-            usage = cmd.get('usage_count', 0) + 1
-            self.db.update_command(bot_id, command_id, {'usage_count': usage})
-            return True
-        return False
+        """Count a use of a command; written to the store by the next flush"""
+        with self._usage_lock:
+            pending = self._pending_usage.get(bot_id)
+            if pending is None:
+                pending = self._pending_usage[bot_id] = Counter()
+            pending[command_id] += 1
+        return True
+    
+    def get_pending_usage(self, bot_id: str) -> Dict[str, int]:
+        """Get the uses of a bot's commands not yet written to the store"""
+        with self._usage_lock:
+            return dict(self._pending_usage.get(bot_id, {}))
+    
+    def _flush_loop(self):
+        """Write buffered usage counts every flush interval"""
+        while not self._closed.wait(self.usage_flush_interval):
+            self.flush_usage()
+    
+    def flush_usage(self) -> bool:
+        """Write buffered usage counts, one batch per bot"""
+        with self._usage_flush_lock:
+            with self._usage_lock:
+                pending, self._pending_usage = self._pending_usage, {}
+            ok = True
+            for bot_id, counts in pending.items():
+                if not self.db.add_command_usage(bot_id, counts):
+                    # Keep the counts for the next flush
+                    with self._usage_lock:
+                        self._pending_usage.setdefault(bot_id, Counter()).update(counts)
+                    ok = False
+            return ok
+    
+    def close(self):
+        """Stop the background flush and write the remaining counts"""
+        self._closed.set()
+        self.flush_usage()
     
     def export_commands(self, bot_id: str) -> Dict[str, Any]:
         """Export all commands for backup"""
@@ -183,17 +229,23 @@ class CommandManager:
         imported = 0
         skipped = 0
         
-        for cmd_id, cmd_data in commands.items():
-            existing = self.get_command(bot_id, cmd_id)
-            
-            if existing and not overwrite:
-                skipped += 1
-                continue
-            
-            if existing:
-                self.db.update_command(bot_id, cmd_id, cmd_data)
-            else:
-                self.db.add_command(bot_id, cmd_id, cmd_data)
-            imported += 1
+        # All commands are written at once, or none at all
+        try:
+            with self.db.batch(bot_id) as tx:
+                for cmd_id, cmd_data in commands.items():
+                    existing = tx.get_command(cmd_id)
+                    
+                    if existing and not overwrite:
+                        skipped += 1
+                        continue
+                    
+                    if existing:
+                        tx.update_command(cmd_id, cmd_data)
+                    else:
+                        tx.add_command(cmd_id, cmd_data)
+                    imported += 1
+        except Exception as e:
+            print(f"[CommandManager] Error importing commands: {e}")
+            return False, "Error al importar los comandos"
         
         return True, f"Importados: {imported}, Omitidos: {skipped}"
@@ -1,53 +1,716 @@
-import json
+import atexit
 import os
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, deque
+from contextlib import ExitStack, contextmanager
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+from backend.database.backends import (
+    JSONBackend,
+    StorageBackend,
+    apply_op,
+    commands_document,
+    op_document,
+    touched_documents
+)
+from backend.database.journal import JournalBackend
+from backend.database.locking import release_lock, try_lock
+from backend.database.snapshot import CatalogSnapshot, SnapshotStore
+from backend.database.sqlite_backend import SQLiteBackend
+from backend.utils.histogram import LatencyHistogram
+from backend.utils.json_codec import codec
+
+
+def _coalesce(ops: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop ops superseded by a later op on the same record"""
+    latest: Dict[tuple, Dict[str, Any]] = {}
+    for op in ops:
+        key = (op_document(op), op.get("command_id", op.get("bot_id")))
+        latest.pop(key, None)
+        latest[key] = op
+    return list(latest.values())
+
+
+def _copy_record(record: Any) -> Any:
+    """Copy a record two levels deep so callers can mutate it safely"""
+    if not isinstance(record, dict):
+        return record
+    return {
+        key: dict(value) if isinstance(value, dict) else list(value) if isinstance(value, list) else value
+        for key, value in record.items()
+    }
+
+
+class VersionConflict(Exception):
+    """A write expected a different version of the record than the stored one"""
+    
+    def __init__(self, expected: int, current: Optional[int]):
+        super().__init__(f"Expected version {expected}, found {current}")
+        self.expected = expected
+        self.current = current
+
+
+class StoreInUse(RuntimeError):
+    """Another process holds the data directory in a mode that excludes this one"""
+
+
+def _versioned(record: Dict[str, Any], current: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Stamp a record with the version after `current` (records written before versioning count as 0)"""
+    record.pop("version", None)
+    record["version"] = (current or {}).get("version", 0) + 1
+    return record
+
+
+def _check_version(current: Optional[Dict[str, Any]], expected_version: Optional[int]):
+    """Raise VersionConflict unless the stored record is at the expected version"""
+    if expected_version is None:
+        return
+    found = None if current is None else current.get("version", 0)
+    if found != expected_version:
+        raise VersionConflict(expected_version, found)
+
+
+class Transaction:
+    """Staged command mutations for one bot, committed together by DatabaseManager.batch"""
+    
+    def __init__(self, bot_id: str, catalog: Dict[str, Any]):
+        self.bot_id = bot_id
+        self.ops: List[Dict[str, Any]] = []
+        self._catalog = catalog
+        # command_id -> staged record, or None once deleted in this batch
+        self._staged: Dict[str, Optional[Dict[str, Any]]] = {}
+    
+    def _current(self, command_id: str) -> Optional[Dict[str, Any]]:
+        if command_id in self._staged:
+            return self._staged[command_id]
+        return self._catalog.get(command_id)
+    
+    def _put(self, command_id: str, record: Dict[str, Any]):
+        self._staged[command_id] = record
+        self.ops.append({"op": "put_command", "bot_id": self.bot_id, "command_id": command_id, "data": record})
+    
+    def get_command(self, command_id: str) -> Optional[Dict[str, Any]]:
+        """Get a command as it would look after this batch"""
+        return _copy_record(self._current(command_id))
+    
+    def add_command(self, command_id: str, command_data: Dict[str, Any]) -> bool:
+        """Stage adding (or replacing) a command"""
+        self._put(command_id, _versioned(dict(command_data), self._current(command_id)))
+        return True
+    
+    def update_command(self, command_id: str, updates: Dict[str, Any],
+                       expected_version: Optional[int] = None) -> bool:
+        """Stage updating an existing command; a version mismatch aborts the whole batch"""
+        current = self._current(command_id)
+        _check_version(current, expected_version)
+        if current is None:
+            return False
+        self._put(command_id, _versioned({**current, **updates}, current))
+        return True
+    
+    def delete_command(self, command_id: str, expected_version: Optional[int] = None) -> bool:
+        """Stage deleting a command"""
+        _check_version(self._current(command_id), expected_version)
+        if self._current(command_id) is None:
+            return False
+        self._staged[command_id] = None
+        self.ops.append({"op": "delete_command", "bot_id": self.bot_id, "command_id": command_id})
+        return True
+
+
 class DatabaseManager:
-    """Local JSON-based database manager for Far-Bot data"""
+    """Local database manager for Far-Bot data"""
     
-    def __init__(self, db_path: str = "data"):
+    def __init__(self, db_path: str = "data", backend: Optional[StorageBackend] = None,
+                 flush_interval: Optional[float] = None):
         self.db_path = Path(db_path)
         self.db_path.mkdir(exist_ok=True)
-        self.bots_file = self.db_path / "bots.json"
-        self.commands_file = self.db_path / "commands.json"
         self.config_file = self.db_path / "config.json"
-        self._initialize_files()
+        self.settings = self._load_json(self.config_file).get("database", {})
+        # Shared mode: other processes (e.g. the panel and a bot runner) write the same store
+        self.shared = bool(self.settings.get("shared", False))
+        # Held until close: exclusive normally, so a second process (e.g. the backup CLI) cannot
+        # compact or copy the store behind this one's back; shared in shared mode
+        self._store_lock = try_lock(self.db_path / ".locks" / "store.lock", shared=self.shared)
+        if self._store_lock is None:
+            raise StoreInUse(
+                f"{self.db_path} is in use by another Far-Bot process"
+                + ("" if self.shared else " (enable database.shared to open it from several processes)")
+            )
+        
+        # Parsed documents stay resident, least recently used first; disk is only touched to persist
+        self._documents: Dict[str, Dict[str, Any]] = OrderedDict()
+        self._lock = threading.RLock()
+        # Writers only serialize on the document they touch (one per bot catalog)
+        self._document_locks: Dict[str, threading.RLock] = {}
+        # Per-thread count of document locks held, so eviction never pulls a document from under its holder
+        self._local = threading.local()
+        # Storage signature each resident document was loaded at, and file locks held per document
+        self._signatures: Dict[str, Any] = {}
+        self._process_locks: Dict[str, int] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.stale_reloads = 0
+        # Storage latency per operation: document loads, write-through commits and flushes
+        self.op_timings: Dict[str, LatencyHistogram] = {
+            "load": LatencyHistogram(), "commit": LatencyHistogram(), "flush": LatencyHistogram()
+        }
+        
+        # Command catalogs of bots that are not pinned (running) are evicted, least recently
+        # used first, once their approximate encoded size exceeds the budget (0 = no limit).
+        # Measuring means re-encoding records, so sizes are only tracked with a budget
+        self.memory_budget = int(self.settings.get("memory_budget_mb", 0) * 1024 * 1024)
+        self._catalog_sizes: Dict[str, int] = {}
+        self._pinned: set = set()
+        self.evictions = 0
+        
+        # Change feed: a revision counter and a bounded log of (revision, op, command_id) per bot.
+        # Both live in memory, so the epoch changes on restart and clients start over
+        self.epoch = uuid.uuid4().hex
+        self.change_log_size = self.settings.get("change_log_size", 1000)
+        self._revisions: Dict[str, int] = {}
+        self._changes: Dict[str, deque] = {}
+        
+        # Write coalescing: with a flush interval, ops are queued and persisted in groups
+        if flush_interval is None:
+            flush_interval = self.settings.get("flush_interval_ms", 0) / 1000
+        if self.shared and flush_interval > 0:
+            # Queued writes would be invisible to the other processes
+            print("[DB] Write coalescing is disabled in shared mode")
+            flush_interval = 0
+        self.flush_interval = flush_interval
+        self._pending: List[Dict[str, Any]] = []
+        # Documents with queued or in-flight ops; the flusher needs them resident
+        self._unflushed: set = set()
+        self._flush_lock = threading.Lock()
+        self._flush_requested = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._closed = False
+        self.disk_writes = 0
+        
+        try:
+            self.backend = backend or self._create_backend()
+        except Exception:
+            release_lock(self._store_lock)
+            raise
+        
+        # Binary catalog snapshots, validated against the JSON file they were taken from
+        self.snapshots: Optional[SnapshotStore] = None
+        # Mapped snapshots of non-resident catalogs, for single-command reads (bounded: each holds a file descriptor)
+        self._open_snapshots: Dict[str, CatalogSnapshot] = OrderedDict()
+        self.open_snapshot_limit = self.settings.get("open_snapshot_limit", 64)
+        if self.settings.get("snapshots"):
+            if self.backend.name == "json":
+                self.snapshots = SnapshotStore(self.db_path)
+            else:
+                print(f"[DB] Snapshots need the json backend, not {self.backend.name}")
+        if self.flush_interval > 0:
+            atexit.register(self.flush)
     
-    def _initialize_files(self):
-        """Initialize database files if they don't exist"""
-        if not self.bots_file.exists():
-            self._save_json(self.bots_file, {})
-        if not self.commands_file.exists():
-            self._save_json(self.commands_file, {})
-        if not self.config_file.exists():
-            self._save_json(self.config_file, {"version": "1.0.0"})
+    def _create_backend(self) -> StorageBackend:
+        """Create the storage backend selected in config.json"""
+        settings = self.settings
+        storage = settings.get("type", "json")
+        if storage == "sqlite":
+            return SQLiteBackend(self.db_path, settings.get("file", "far-bot.db"))
+        if storage == "json" and settings.get("journal") and self.shared:
+            print("[DB] The journal does not support shared mode, using json")
+        elif storage == "json" and settings.get("journal"):
+            # Not shared, so this process holds the store lock exclusively
+            return JournalBackend(
+                self.db_path,
+                compact_every=settings.get("compact_every", 1000),
+                fsync=settings.get("fsync", False),
+                exclusive=True
+            )
+        if storage != "json":
+            print(f"[DB] Unknown storage type '{storage}', using json")
+        return JSONBackend(self.db_path)
     
     def _load_json(self, file_path: Path) -> Dict[str, Any]:
         """Load JSON from file"""
         try:
-            with open(file_path, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
+            return codec.load_file(file_path)
+        except (ValueError, FileNotFoundError):
             return {}
     
-    def _save_json(self, file_path: Path, data: Dict[str, Any]):
-        """Save JSON to file"""
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2)
+    def _save_json(self, file_path: Path, data: Dict[str, Any], pretty: bool = True):
+        """Save JSON to file atomically so a copy never sees it half-written"""
+        tmp_path = file_path.with_name(file_path.name + ".tmp")
+        codec.dump_file(tmp_path, data, pretty=pretty)
+        os.replace(tmp_path, file_path)
+    
+    # DOCUMENT CACHE
+    def _document_lock(self, name: str) -> threading.RLock:
+        """Get the lock guarding a single document"""
+        with self._lock:
+            lock = self._document_locks.get(name)
+            if lock is None:
+                lock = self._document_locks[name] = threading.RLock()
+            return lock
+    
+    @contextmanager
+    def _locked(self, *names: str):
+        """Hold the locks of several documents, always in the same order"""
+        names = sorted(set(names))
+        locks = [self._document_lock(name) for name in names]
+        held = self._held()
+        for lock in locks:
+            lock.acquire()
+        held.update(names)
+        try:
+            yield
+        finally:
+            held.subtract(names)
+            for lock in reversed(locks):
+                lock.release()
+    
+    def _held(self) -> Counter:
+        """Get the document locks held by the current thread"""
+        held = getattr(self._local, "held", None)
+        if held is None:
+            held = self._local.held = Counter()
+        return held
+    
+    @contextmanager
+    def _write_locked(self, *names: str):
+        """Hold the locks a write needs: document locks, plus file locks in shared mode"""
+        names = sorted(set(names))
+        with self._locked(*names), ExitStack() as stack:
+            if self.shared:
+                for name in names:
+                    # flock is per open file, so only the outermost write takes it
+                    if not self._process_locks.get(name):
+                        stack.enter_context(self.backend.lock(name))
+                    self._process_locks[name] = self._process_locks.get(name, 0) + 1
+                    stack.callback(self._release_process_lock, name)
+            yield
+    
+    def _release_process_lock(self, name: str):
+        self._process_locks[name] -= 1
+    
+    def _get_document(self, name: str) -> Dict[str, Any]:
+        """Get the resident copy of a document, loading it on first access
+        
+        In shared mode the copy is revalidated against the storage signature
+        (mtime, size and inode for JSON files) and only reparsed when another
+        process has changed it.
+        """
+        with self._lock:
+            document = self._documents.get(name)
+            if document is not None and not self.shared:
+                self._documents.move_to_end(name)
+                self.cache_hits += 1
+                return document
+        with self._document_lock(name):
+            # Taken before loading, so a concurrent change only causes another reload
+            signature = self.backend.signature(name) if self.shared else None
+            with self._lock:
+                document = self._documents.get(name)
+                if document is not None and self._signatures.get(name) == signature:
+                    self._documents.move_to_end(name)
+                    self.cache_hits += 1
+                    return document
+                stale = document is not None
+                if stale:
+                    self.stale_reloads += 1
+                self.cache_misses += 1
+            # Parse outside the global lock so other documents stay available
+            started = time.perf_counter()
+            document = self._load_document(name)
+            elapsed = time.perf_counter() - started
+            size = len(codec.dumps(document)) if self.memory_budget and name.startswith("commands/") else None
+            with self._lock:
+                self.op_timings["load"].record(elapsed)
+                self._documents[name] = document
+                self._signatures[name] = signature
+                if size is not None:
+                    self._catalog_sizes[name] = size
+                if stale and name.startswith("commands/"):
+                    # Another process changed the catalog; we cannot tell what, so readers start over
+                    self._record_change(name[len("commands/"):], "reload", None)
+            self._evict(keep=name)
+            return document
+    
+    def _load_document(self, name: str) -> Dict[str, Any]:
+        """Load a document from storage, from a fresh catalog snapshot when there is one"""
+        if self.snapshots is None or not name.startswith("commands/"):
+            return self.backend.load(name)
+        snapshot = self._snapshot(name)
+        if snapshot is not None:
+            document = snapshot.load_all()
+            # Resident from now on, so the mapping is no longer needed
+            self._close_snapshot(name[len("commands/"):])
+            return document
+        # Stat before reading: if another process writes in between, the snapshot carries the
+        # older signature and is simply rebuilt, instead of passing off old content as new
+        signature = self.backend.signature(name)
+        document = self.backend.load(name)
+        if document:
+            self._write_snapshots([name], {name: document}, {name: signature})
+        return document
+    
+    def _snapshot(self, name: str) -> Optional[CatalogSnapshot]:
+        """Get the open snapshot of a catalog if it is still current; caller holds the document lock"""
+        bot_id = name[len("commands/"):]
+        signature = self.backend.signature(name)
+        with self._lock:
+            snapshot = self._open_snapshots.get(bot_id)
+            if snapshot is not None and snapshot.signature == signature:
+                self._open_snapshots.move_to_end(bot_id)
+                return snapshot
+        self._close_snapshot(bot_id)
+        snapshot = self.snapshots.open(bot_id, signature)
+        if snapshot is not None:
+            with self._lock:
+                self._open_snapshots[bot_id] = snapshot
+                excess = len(self._open_snapshots) - self.open_snapshot_limit
+                oldest = [other for other in list(self._open_snapshots)[:max(excess, 0)] if other != bot_id]
+            for other in oldest:
+                self._trim_snapshot(other)
+        return snapshot
+    
+    def _close_snapshot(self, bot_id: str):
+        """Unmap a catalog's snapshot; caller holds the catalog's lock"""
+        with self._lock:
+            snapshot = self._open_snapshots.pop(bot_id, None)
+        if snapshot is not None:
+            snapshot.close()
+    
+    def _trim_snapshot(self, bot_id: str):
+        """Unmap another catalog's snapshot unless someone is reading it"""
+        name = commands_document(bot_id)
+        if self._held()[name] > 0:
+            return
+        lock = self._document_lock(name)
+        if lock.acquire(blocking=False):
+            try:
+                self._close_snapshot(bot_id)
+            finally:
+                lock.release()
+    
+    def _write_snapshots(self, names: List[str], documents: Dict[str, Dict[str, Any]],
+                         signatures: Optional[Dict[str, Any]] = None):
+        """Refresh the snapshots of catalogs just written; caller holds their locks
+        
+        `signatures` gives the storage signature each document was read at;
+        without it the current one is used, which is only right for our own writes.
+        """
+        if self.snapshots is None:
+            return
+        for name in names:
+            if not name.startswith("commands/"):
+                continue
+            bot_id = name[len("commands/"):]
+            # Unmap first: Windows cannot replace a mapped file
+            self._close_snapshot(bot_id)
+            try:
+                signature = signatures[name] if signatures else self.backend.signature(name)
+                self.snapshots.write(bot_id, documents[name], signature)
+            except Exception as e:
+                # The JSON file is the source of truth; a missing snapshot only costs speed
+                self.snapshots.remove(bot_id)
+                print(f"[DB] Error writing snapshot for {bot_id}: {e}")
+    
+    def _resize(self, ops: List[Dict[str, Any]]):
+        """Adjust catalog sizes for ops about to be applied; caller holds the document locks
+        
+        Each op is measured against the record left by the earlier ops of the
+        same group, so several ops on one command are only counted once.
+        """
+        if not self.memory_budget:
+            return
+        staged: Dict[tuple, Any] = {}
+        with self._lock:
+            for op in ops:
+                name = op_document(op)
+                if name not in self._catalog_sizes:
+                    continue
+                key = (name, op["command_id"])
+                old = staged[key] if key in staged else self._documents[name].get(op["command_id"])
+                new = staged[key] = op.get("data")
+                delta = len(codec.dumps(new)) if new is not None else 0
+                if old is not None:
+                    delta -= len(codec.dumps(old))
+                self._catalog_sizes[name] += delta
+    
+    def _evict(self, keep: Optional[str] = None):
+        """Drop least recently used catalogs of unpinned bots until under the memory budget"""
+        if not self.memory_budget:
+            return
+        with self._lock:
+            excess = sum(self._catalog_sizes.values()) - self.memory_budget
+            if excess <= 0:
+                return
+            held = self._held()
+            candidates = [
+                name for name in self._documents
+                if name in self._catalog_sizes and name != keep and held[name] <= 0
+                and name[len("commands/"):] not in self._pinned
+            ]
+        for name in candidates:
+            if excess <= 0:
+                break
+            # Never wait here: the caller may hold another document's lock
+            lock = self._document_lock(name)
+            if not lock.acquire(blocking=False):
+                continue
+            try:
+                with self._lock:
+                    if name in self._unflushed or name not in self._documents:
+                        continue
+                    del self._documents[name]
+                    self._signatures.pop(name, None)
+                    excess -= self._catalog_sizes.pop(name, 0)
+                    self.evictions += 1
+            finally:
+                lock.release()
+    
+    def pin_bot(self, bot_id: str):
+        """Keep a bot's command catalog resident (used while the bot runs)"""
+        with self._lock:
+            self._pinned.add(bot_id)
+    
+    def unpin_bot(self, bot_id: str):
+        """Let a bot's command catalog be evicted again"""
+        with self._lock:
+            self._pinned.discard(bot_id)
+        self._evict()
+    
+    def _commit(self, ops: List[Dict[str, Any]]):
+        """Apply ops to the resident documents and persist them"""
+        names = touched_documents(ops)
+        with self._write_locked(*names):
+            for name in names:
+                self._get_document(name)
+            self._resize(ops)
+            if self.flush_interval > 0:
+                for op in ops:
+                    apply_op(self._documents, op)
+                self._queue(ops)
+                self._record_changes(ops)
+                self._evict()
+                return
+            try:
+                started = time.perf_counter()
+                for op in ops:
+                    apply_op(self._documents, op)
+                self.backend.write(ops, self._documents)
+                self.disk_writes += 1
+                self._write_snapshots(names, self._documents)
+                self._time_op("commit", started)
+                if self.shared:
+                    # Still under the file locks, so these signatures are our own writes
+                    with self._lock:
+                        for name in names:
+                            self._signatures[name] = self.backend.signature(name)
+            except Exception:
+                # Memory may now be ahead of disk; reload on next access
+                with self._lock:
+                    for name in names:
+                        self._documents.pop(name, None)
+                        self._catalog_sizes.pop(name, None)
+                raise
+            self._record_changes(ops)
+        self._evict()
+    
+    # CHANGE FEED
+    def _record_change(self, bot_id: str, kind: str, command_id: Optional[str]):
+        """Bump a bot's revision and log the change; caller holds the global lock"""
+        revision = self._revisions.get(bot_id, 0) + 1
+        self._revisions[bot_id] = revision
+        changes = self._changes.get(bot_id)
+        if changes is None:
+            changes = self._changes[bot_id] = deque(maxlen=self.change_log_size)
+        changes.append((revision, kind, command_id))
+    
+    def _record_changes(self, ops: List[Dict[str, Any]]):
+        with self._lock:
+            for op in ops:
+                # Counter updates change no behaviour, so running bots are not told to reload
+                if "bot_id" in op and not op.get("counter"):
+                    self._record_change(op["bot_id"], op["op"], op.get("command_id"))
+    
+    def get_revision(self, bot_id: str) -> int:
+        """Get the current revision of a bot"""
+        with self._lock:
+            return self._revisions.get(bot_id, 0)
+    
+    def changes_since(self, bot_id: str, revision: int, epoch: Optional[str] = None) -> Dict[str, Any]:
+        """Get the changes made to a bot after a revision
+        
+        When the log no longer reaches back to `revision`, or `epoch` belongs
+        to an earlier run, "full" is set and the caller should refetch
+        everything. A "reload" change means the same.
+        """
+        with self._lock:
+            current = self._revisions.get(bot_id, 0)
+            changes = self._changes.get(bot_id, ())
+            oldest = changes[0][0] if changes else current + 1
+            full = (
+                (epoch is not None and epoch != self.epoch)
+                or revision > current
+                or revision < oldest - 1
+            )
+            return {
+                "epoch": self.epoch,
+                "revision": current,
+                "full": full,
+                "changes": [] if full else [
+                    {"revision": rev, "op": kind, "command_id": command_id}
+                    for rev, kind, command_id in changes if rev > revision
+                ]
+            }
+    
+    # WRITE COALESCING
+    def _queue(self, ops: List[Dict[str, Any]]):
+        """Queue ops for the background flusher"""
+        with self._lock:
+            self._pending.extend(ops)
+            self._unflushed.update(touched_documents(ops))
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+                self._flusher.start()
+        self._flush_requested.set()
+    
+    def _flush_loop(self):
+        """Persist queued ops at most once per flush interval"""
+        while not self._closed:
+            self._flush_requested.wait()
+            self._flush_requested.clear()
+            # Let the burst that woke us up finish before writing
+            time.sleep(self.flush_interval)
+            self.flush()
+    
+    def flush(self) -> bool:
+        """Persist every queued op now"""
+        with self._flush_lock:
+            return self._flush()
+    
+    def _flush(self) -> bool:
+        """Persist queued ops; caller holds the flush lock"""
+        with self._lock:
+            ops, self._pending = self._pending, []
+        if not ops:
+            return True
+        ops = _coalesce(ops)
+        names = touched_documents(ops)
+        try:
+            started = time.perf_counter()
+            with self._locked(*names):
+                self.backend.write(ops, self._documents)
+                self.disk_writes += 1
+                self._write_snapshots(names, self._documents)
+            self._time_op("flush", started)
+            with self._lock:
+                self._unflushed = set(touched_documents(self._pending))
+            return True
+        except Exception as e:
+            # Keep the ops queued so the next flush retries them in order
+            with self._lock:
+                self._pending[:0] = ops
+            print(f"[DB] Error flushing writes: {e}")
+            return False
+    
+    @contextmanager
+    def frozen(self):
+        """Block every write and flush the store so its files can be copied consistently"""
+        with self._lock:
+            names = {"bots", "config"} | set(self._documents)
+        names |= {commands_document(bot_id) for bot_id in self.get_all_bots()}
+        # Same order as flush(): the flush lock first, then the documents
+        with self._flush_lock, self._write_locked(*names):
+            # Inside the locks, so nothing can be queued behind this flush
+            if not self._flush():
+                raise RuntimeError("Could not flush pending writes")
+            self.backend.checkpoint()
+            yield
+    
+    def invalidate_cache(self, name: Optional[str] = None):
+        """Drop cached documents so they are reloaded from storage"""
+        self.flush()
+        with self._lock:
+            if name is None:
+                self._documents.clear()
+                self._catalog_sizes.clear()
+            else:
+                self._documents.pop(name, None)
+                self._catalog_sizes.pop(name, None)
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get cache hit/miss counters"""
+        with self._lock:
+            lookups = self.cache_hits + self.cache_misses
+            return {
+                "backend": self.backend.name,
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "stale_reloads": self.stale_reloads,
+                "shared": self.shared,
+                "hit_ratio": self.cache_hits / lookups if lookups else 0.0,
+                "documents": len(self._documents),
+                "resident_catalogs": sum(1 for name in self._documents if name.startswith("commands/")),
+                # Only measured with a memory budget
+                "resident_bytes": sum(self._catalog_sizes.values()) if self.memory_budget else None,
+                "memory_budget": self.memory_budget,
+                "pinned": len(self._pinned),
+                "evictions": self.evictions,
+                "pending_ops": len(self._pending),
+                "disk_writes": self.disk_writes
+            }
+    
+    def _time_op(self, op: str, started: float):
+        """Record a storage operation that began at perf_counter() `started`"""
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.op_timings[op].record(elapsed)
+    
+    def get_op_timings(self) -> Dict[str, LatencyHistogram]:
+        """Get a copy of the storage latency histograms, by operation"""
+        with self._lock:
+            return {op: LatencyHistogram.merged([histogram]) for op, histogram in self.op_timings.items()}
+    
+    def get_resident_sizes(self) -> Dict[str, int]:
+        """Get the approximate encoded size of every resident command catalog, by bot
+        
+        Empty unless a memory budget is set, since sizes are not measured otherwise.
+        """
+        with self._lock:
+            return {
+                name[len("commands/"):]: size
+                for name, size in sorted(self._catalog_sizes.items(), key=lambda item: -item[1])
+            }
+    
+    def close(self):
+        """Flush queued writes and close the storage backend"""
+        self.flush()
+        self._closed = True
+        self._flush_requested.set()
+        with self._lock:
+            for snapshot in self._open_snapshots.values():
+                snapshot.close()
+            self._open_snapshots.clear()
+            self.backend.close()
+            if self._store_lock is not None:
+                release_lock(self._store_lock)
+                self._store_lock = None
     
     # BOT MANAGEMENT
     def add_bot(self, bot_id: str, bot_data: Dict[str, Any]) -> bool:
         """Add a new bot"""
         try:
-            bots = self._load_json(self.bots_file)
-            bots[bot_id] = {
+            record = {
                 **bot_data,
                 "created_at": str(Path.cwd()),
                 "status": "stopped",
                 "stats": {"commands_run": 0, "errors": 0}
             }
-            self._save_json(self.bots_file, bots)
+            with self._write_locked("bots"):
+                _versioned(record, self._get_document("bots").get(bot_id))
+                self._commit([{"op": "put_bot", "bot_id": bot_id, "data": record}])
             return True
         except Exception as e:
             print(f"[DB] Error adding bot: {e}")
@@ -55,35 +718,49 @@ class DatabaseManager:
     
     def get_bot(self, bot_id: str) -> Optional[Dict[str, Any]]:
         """Get bot by ID"""
-        bots = self._load_json(self.bots_file)
-        return bots.get(bot_id)
+        with self._locked("bots"):
+            bots = self._get_document("bots")
+            return _copy_record(bots.get(bot_id))
     
     def get_all_bots(self) -> Dict[str, Any]:
         """Get all bots"""
-        return self._load_json(self.bots_file)
+        with self._locked("bots"):
+            bots = self._get_document("bots")
+            return {bot_id: _copy_record(bot) for bot_id, bot in bots.items()}
     
-    def update_bot(self, bot_id: str, updates: Dict[str, Any]) -> bool:
-        """Update bot configuration"""
+    def update_bot(self, bot_id: str, updates: Dict[str, Any], expected_version: Optional[int] = None) -> int:
+        """Update bot configuration; returns the new version, or 0 if nothing was updated
+        
+        With `expected_version`, raises VersionConflict if the bot was
+        changed (or deleted) since that version was read.
+        """
         try:
-            bots = self._load_json(self.bots_file)
-            if bot_id in bots:
-                bots[bot_id].update(updates)
-                self._save_json(self.bots_file, bots)
-                return True
-            return False
+            with self._write_locked("bots"):
+                bots = self._get_document("bots")
+                _check_version(bots.get(bot_id), expected_version)
+                if bot_id not in bots:
+                    return 0
+                record = _versioned({**bots[bot_id], **updates}, bots[bot_id])
+                self._commit([{"op": "put_bot", "bot_id": bot_id, "data": record}])
+            return record["version"]
+        except VersionConflict:
+            raise
         except Exception as e:
             print(f"[DB] Error updating bot: {e}")
-            return False
+            return 0
     
-    def delete_bot(self, bot_id: str) -> bool:
+    def delete_bot(self, bot_id: str, expected_version: Optional[int] = None) -> bool:
         """Delete a bot"""
         try:
-            bots = self._load_json(self.bots_file)
-            if bot_id in bots:
-                del bots[bot_id]
-                self._save_json(self.bots_file, bots)
-                return True
-            return False
+            with self._write_locked("bots"):
+                bots = self._get_document("bots")
+                _check_version(bots.get(bot_id), expected_version)
+                if bot_id not in bots:
+                    return False
+                self._commit([{"op": "delete_bot", "bot_id": bot_id}])
+            return True
+        except VersionConflict:
+            raise
         except Exception as e:
             print(f"[DB] Error deleting bot: {e}")
             return False
@@ -92,11 +769,15 @@ class DatabaseManager:
     def add_command(self, bot_id: str, command_id: str, command_data: Dict[str, Any]) -> bool:
         """Add a command to a bot"""
         try:
-            commands = self._load_json(self.commands_file)
-            if bot_id not in commands:
-                commands[bot_id] = {}
-            commands[bot_id][command_id] = command_data
-            self._save_json(self.commands_file, commands)
+            name = commands_document(bot_id)
+            with self._write_locked(name):
+                record = _versioned(dict(command_data), self._get_document(name).get(command_id))
+                self._commit([{
+                    "op": "put_command",
+                    "bot_id": bot_id,
+                    "command_id": command_id,
+                    "data": record
+                }])
             return True
         except Exception as e:
             print(f"[DB] Error adding command: {e}")
@@ -104,46 +785,127 @@ class DatabaseManager:
     
     def get_commands(self, bot_id: str) -> Dict[str, Any]:
         """Get all commands for a bot"""
-        commands = self._load_json(self.commands_file)
-        return commands.get(bot_id, {})
+        name = commands_document(bot_id)
+        with self._locked(name):
+            commands = self._get_document(name)
+            return {cmd_id: _copy_record(cmd) for cmd_id, cmd in commands.items()}
+    
+    def get_command(self, bot_id: str, command_id: str) -> Optional[Dict[str, Any]]:
+        """Get a single command without copying the rest of the catalog
+        
+        When the catalog is not resident and a current snapshot exists, only
+        this command is decoded.
+        """
+        name = commands_document(bot_id)
+        with self._locked(name):
+            if self.snapshots is not None:
+                with self._lock:
+                    resident = name in self._documents
+                snapshot = None if resident else self._snapshot(name)
+                if snapshot is not None:
+                    return snapshot.get(command_id)
+            return _copy_record(self._get_document(name).get(command_id))
     
-    def update_command(self, bot_id: str, command_id: str, updates: Dict[str, Any]) -> bool:
-        """Update a command"""
+    def update_command(self, bot_id: str, command_id: str, updates: Dict[str, Any],
+                       expected_version: Optional[int] = None) -> int:
+        """Update a command; returns the new version, or 0 if nothing was updated
+        
+        With `expected_version`, raises VersionConflict if the command was
+        changed (or deleted) since that version was read.
+        """
         try:
-            commands = self._load_json(self.commands_file)
-            if bot_id in commands and command_id in commands[bot_id]:
-                commands[bot_id][command_id].update(updates)
-                self._save_json(self.commands_file, commands)
-                return True
-            return False
+            name = commands_document(bot_id)
+            with self._write_locked(name):
+                catalog = self._get_document(name)
+                _check_version(catalog.get(command_id), expected_version)
+                if command_id not in catalog:
+                    return 0
+                record = _versioned({**catalog[command_id], **updates}, catalog[command_id])
+                self._commit([{
+                    "op": "put_command",
+                    "bot_id": bot_id,
+                    "command_id": command_id,
+                    "data": record
+                }])
+            return record["version"]
+        except VersionConflict:
+            raise
         except Exception as e:
             print(f"[DB] Error updating command: {e}")
-            return False
+            return 0
     
-    def delete_command(self, bot_id: str, command_id: str) -> bool:
+    def delete_command(self, bot_id: str, command_id: str, expected_version: Optional[int] = None) -> bool:
         """Delete a command"""
         try:
-            commands = self._load_json(self.commands_file)
-            if bot_id in commands and command_id in commands[bot_id]:
-                del commands[bot_id][command_id]
-                self._save_json(self.commands_file, commands)
-                return True
-            return False
+            name = commands_document(bot_id)
+            with self._write_locked(name):
+                catalog = self._get_document(name)
+                _check_version(catalog.get(command_id), expected_version)
+                if command_id not in catalog:
+                    return False
+                self._commit([{"op": "delete_command", "bot_id": bot_id, "command_id": command_id}])
+            return True
+        except VersionConflict:
+            raise
         except Exception as e:
             print(f"[DB] Error deleting command: {e}")
             return False
     
+    def add_command_usage(self, bot_id: str, counts: Dict[str, int]) -> bool:
+        """Add to the usage_count of several commands with one write
+        
+        Usage counters are not edits: the command versions stay the same and
+        no change is logged. Commands that no longer exist are skipped.
+        """
+        try:
+            name = commands_document(bot_id)
+            with self._write_locked(name):
+                catalog = self._get_document(name)
+                ops = [
+                    {
+                        "op": "put_command",
+                        "bot_id": bot_id,
+                        "command_id": command_id,
+                        "data": {**catalog[command_id], "usage_count": catalog[command_id].get("usage_count", 0) + count},
+                        "counter": True
+                    }
+                    for command_id, count in counts.items()
+                    if command_id in catalog
+                ]
+                if ops:
+                    self._commit(ops)
+            return True
+        except Exception as e:
+            print(f"[DB] Error updating command usage: {e}")
+            return False
+    
+    @contextmanager
+    def batch(self, bot_id: str):
+        """Apply many command mutations for a bot with one load and one atomic write
+        
+        Usage: ``with db.batch(bot_id) as tx: tx.add_command(...)``. Nothing
+        is applied if the block raises, and a failed write leaves the store
+        as it was.
+        """
+        name = commands_document(bot_id)
+        with self._write_locked(name):
+            tx = Transaction(bot_id, self._get_document(name))
+            yield tx
+            if tx.ops:
+                self._commit(tx.ops)
+    
     # CONFIG MANAGEMENT
     def get_config(self) -> Dict[str, Any]:
         """Get global config"""
-        return self._load_json(self.config_file)
+        with self._locked("config"):
+            return _copy_record(self._get_document("config"))
     
     def update_config(self, updates: Dict[str, Any]) -> bool:
         """Update global config"""
         try:
-            config = self._load_json(self.config_file)
-            config.update(updates)
-            self._save_json(self.config_file, config)
+            with self._write_locked("config"):
+                config = {**self._get_document("config"), **updates}
+                self._commit([{"op": "put_config", "data": config}])
             return True
         except Exception as e:
             print(f"[DB] Error updating config: {e}")
@@ -0,0 +1,91 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from backend.database.backends import commands_document
+
+
+# One bounded pool for every bot loop, so a burst of bots cannot spawn unbounded threads
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(max_workers: int = 4) -> ThreadPoolExecutor:
+    """Get the thread pool shared by every AsyncDatabaseManager"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="far-bot-db")
+        return _executor
+
+
+class AsyncDatabaseManager:
+    """Async facade over DatabaseManager for code running on a bot's event loop
+    
+    Every call runs on a bounded thread pool, so file and SQLite I/O never
+    blocks gateway heartbeats. Writes to the same document are queued on
+    the loop instead of piling up pool threads behind the document lock.
+    Create one facade per event loop.
+    """
+    
+    def __init__(self, db, executor: Optional[ThreadPoolExecutor] = None):
+        self.db = db
+        self._executor = executor or get_executor(db.settings.get("async_workers", 4))
+        self._write_locks: Dict[str, asyncio.Lock] = {}
+    
+    async def _run(self, func: Callable, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+    
+    async def _write(self, name: str, func: Callable, *args) -> Any:
+        lock = self._write_locks.get(name)
+        if lock is None:
+            lock = self._write_locks[name] = asyncio.Lock()
+        async with lock:
+            return await self._run(func, *args)
+    
+    # BOT MANAGEMENT
+    async def aget_bot(self, bot_id: str) -> Optional[Dict[str, Any]]:
+        """Get bot by ID"""
+        return await self._run(self.db.get_bot, bot_id)
+    
+    async def aget_all_bots(self) -> Dict[str, Any]:
+        """Get all bots"""
+        return await self._run(self.db.get_all_bots)
+    
+    async def aupdate_bot(self, bot_id: str, updates: Dict[str, Any], expected_version: Optional[int] = None) -> int:
+        """Update bot configuration"""
+        return await self._write("bots", self.db.update_bot, bot_id, updates, expected_version)
+    
+    # COMMAND MANAGEMENT
+    async def aget_commands(self, bot_id: str) -> Dict[str, Any]:
+        """Get all commands for a bot"""
+        return await self._run(self.db.get_commands, bot_id)
+    
+    async def aadd_command(self, bot_id: str, command_id: str, command_data: Dict[str, Any]) -> bool:
+        """Add a command to a bot"""
+        return await self._write(commands_document(bot_id), self.db.add_command, bot_id, command_id, command_data)
+    
+    async def aupdate_command(self, bot_id: str, command_id: str, updates: Dict[str, Any],
+                              expected_version: Optional[int] = None) -> int:
+        """Update a command"""
+        return await self._write(
+            commands_document(bot_id), self.db.update_command, bot_id, command_id, updates, expected_version
+        )
+    
+    async def adelete_command(self, bot_id: str, command_id: str, expected_version: Optional[int] = None) -> bool:
+        """Delete a command"""
+        return await self._write(
+            commands_document(bot_id), self.db.delete_command, bot_id, command_id, expected_version
+        )
+    
+    # CONFIG MANAGEMENT
+    async def aget_config(self) -> Dict[str, Any]:
+        """Get global config"""
+        return await self._run(self.db.get_config)
+    
+    async def aupdate_config(self, updates: Dict[str, Any]) -> bool:
+        """Update global config"""
+        return await self._write("config", self.db.update_config, updates)
@@ -0,0 +1,175 @@
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+from backend.database.locking import file_lock
+from backend.utils.json_codec import codec
+
+
+def commands_document(bot_id: str) -> str:
+    """Get the name of the document holding a bot's command catalog"""
+    return f"commands/{bot_id}"
+
+
+def op_document(op: Dict[str, Any]) -> str:
+    """Get the name of the resident document a mutation touches"""
+    kind = op["op"]
+    if kind in ("put_bot", "delete_bot"):
+        return "bots"
+    if kind in ("put_command", "delete_command"):
+        return commands_document(op["bot_id"])
+    if kind == "put_config":
+        return "config"
+    raise ValueError(f"Unknown op: {kind}")
+
+
+def touched_documents(ops: List[Dict[str, Any]]) -> List[str]:
+    """Get the names of the documents touched by a list of ops, in order"""
+    names = []
+    for op in ops:
+        name = op_document(op)
+        if name not in names:
+            names.append(name)
+    return names
+
+
+def apply_op(documents: Dict[str, Dict[str, Any]], op: Dict[str, Any]):
+    """Apply a single record-level op to the loaded documents"""
+    kind = op["op"]
+    if kind == "put_bot":
+        documents["bots"][op["bot_id"]] = op["data"]
+    elif kind == "delete_bot":
+        documents["bots"].pop(op["bot_id"], None)
+    elif kind == "put_command":
+        documents[commands_document(op["bot_id"])][op["command_id"]] = op["data"]
+    elif kind == "delete_command":
+        documents[commands_document(op["bot_id"])].pop(op["command_id"], None)
+    elif kind == "put_config":
+        documents["config"] = op["data"]
+    else:
+        raise ValueError(f"Unknown op: {kind}")
+
+
+class StorageBackend:
+    """Persistence interface used by DatabaseManager
+    
+    The manager keeps the parsed documents ("bots", "config" and one
+    "commands/<bot_id>" catalog per bot) in memory. A backend only has to
+    load them on demand and persist the record-level ops the manager
+    applies to them.
+    """
+    
+    name = "base"
+    db_path: Path
+    
+    def load(self, name: str) -> Dict[str, Any]:
+        """Load a whole document"""
+        raise NotImplementedError
+    
+    def write(self, ops: List[Dict[str, Any]], documents: Dict[str, Dict[str, Any]]):
+        """Persist a group of ops; documents already reflect them"""
+        raise NotImplementedError
+    
+    def signature(self, name: str) -> Optional[tuple]:
+        """Cheap fingerprint of a document's stored state, or None if unsupported"""
+        return None
+    
+    def checkpoint(self):
+        """Make the files on disk self-contained (used before copying them)"""
+    
+    def lock(self, name: str):
+        """Exclusive cross-process lock on a document, held while it is rewritten"""
+        return file_lock(self.db_path / ".locks" / f"{quote(name, safe='')}.lock")
+    
+    def close(self):
+        """Release any resources held by the backend"""
+
+
+class JSONBackend(StorageBackend):
+    """Flat-file backend: bots.json, config.json and one file per bot under commands/"""
+    
+    name = "json"
+    
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.bots_file = self.db_path / "bots.json"
+        self.config_file = self.db_path / "config.json"
+        self.commands_path = self.db_path / "commands"
+        self._initialize_files()
+        self._migrate_commands_file()
+    
+    def _initialize_files(self):
+        """Initialize database files if they don't exist"""
+        if not self.bots_file.exists():
+            self._save_json(self.bots_file, {})
+        if not self.config_file.exists():
+            self._save_json(self.config_file, {"version": "1.0.0"})
+        self.commands_path.mkdir(exist_ok=True)
+    
+    def _migrate_commands_file(self):
+        """Split a legacy commands.json into per-bot files"""
+        legacy_file = self.db_path / "commands.json"
+        if not legacy_file.exists():
+            return
+        
+        with self.lock("commands.json"):
+            # Another process may have migrated it while we waited
+            if legacy_file.exists():
+                self._split_commands_file(legacy_file)
+    
+    def _split_commands_file(self, legacy_file: Path):
+        """Write each bot's catalog to its own file and retire the legacy file"""
+        commands = self._load_json(legacy_file)
+        migrated = 0
+        for bot_id, catalog in commands.items():
+            # Never clobber a shard that was written after an earlier migration
+            shard = self._commands_file(bot_id)
+            if not shard.exists():
+                self._save_json(shard, catalog)
+                migrated += 1
+        os.replace(legacy_file, legacy_file.with_name("commands.json.migrated"))
+        print(f"[DB] Migrated commands.json into {migrated} per-bot files")
+    
+    def _commands_file(self, bot_id: str) -> Path:
+        """Get the file holding a bot's commands"""
+        filename = quote(bot_id, safe="")
+        if filename.startswith("."):
+            filename = "%2E" + filename[1:]
+        return self.commands_path / f"{filename}.json"
+    
+    def _document_file(self, name: str) -> Path:
+        if name == "bots":
+            return self.bots_file
+        if name == "config":
+            return self.config_file
+        return self._commands_file(name[len("commands/"):])
+    
+    def _load_json(self, file_path: Path) -> Dict[str, Any]:
+        """Load JSON from file"""
+        try:
+            return codec.load_file(file_path)
+        except (ValueError, FileNotFoundError):
+            return {}
+    
+    def _save_json(self, file_path: Path, data: Dict[str, Any]):
+        """Save JSON to file atomically so a crash never leaves it truncated"""
+        tmp_path = file_path.with_name(file_path.name + ".tmp")
+        codec.dump_file(tmp_path, data, pretty=True)
+        os.replace(tmp_path, file_path)
+    
+    def load(self, name: str) -> Dict[str, Any]:
+        return self._load_json(self._document_file(name))
+    
+    def signature(self, name: str) -> Optional[tuple]:
+        # Files are replaced on every write, so the inode changes even when mtime is coarse
+        try:
+            st = os.stat(self._document_file(name))
+        except FileNotFoundError:
+            return (0, 0, 0)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    
+    def write(self, ops: List[Dict[str, Any]], documents: Dict[str, Dict[str, Any]]):
+        # Whole-document rewrite, but only once per document per group
+        for name in touched_documents(ops):
+            self._save_json(self._document_file(name), documents[name])
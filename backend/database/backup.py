@@ -0,0 +1,303 @@
+"""
+Incremental backups of the data directory
+
+Each backup is a manifest listing every file under data/ as a sequence of
+content-addressed chunks (sha256, zlib-compressed) in backups/chunks/. Chunk
+boundaries are content-defined at line granularity, so inserting a command
+into a pretty-printed catalog only produces the chunks around it; files whose
+size and mtime did not change are not even read again.
+
+`create` opens the store itself, so it only runs while Far-Bot is stopped or
+the store is in shared mode; otherwise ask the running server with
+POST /api/backups. `restore` refuses a target that any Far-Bot process has
+open.
+
+Usage:
+    python -m backend.database.backup create
+    python -m backend.database.backup list
+    python -m backend.database.backup restore <backup_id> --target data_restored [--force]
+    python -m backend.database.backup prune --keep 24
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from backend.database import StoreInUse
+from backend.database.locking import release_lock, try_lock
+from backend.utils.json_codec import codec
+
+
+MIN_CHUNK = 1024
+MAX_CHUNK = 64 * 1024
+# A line ends a chunk when its hash matches this mask: about one line in 64
+BOUNDARY_MASK = 0x3F
+
+# Derived or transient files that a restore does not need
+EXCLUDED_DIRS = {".locks", "snapshots"}
+EXCLUDED_SUFFIXES = (".tmp", ".db-wal", ".db-shm")
+
+
+def chunk_lines(data: bytes) -> Iterator[bytes]:
+    """Split data into chunks that end on content-defined line boundaries"""
+    start = 0
+    size = 0
+    for line in data.splitlines(keepends=True):
+        # Overlong lines (compact JSON) are cut at fixed offsets instead
+        while len(line) > MAX_CHUNK:
+            if size:
+                yield data[start:start + size]
+                start += size
+                size = 0
+            yield line[:MAX_CHUNK]
+            start += MAX_CHUNK
+            line = line[MAX_CHUNK:]
+        size += len(line)
+        if size >= MAX_CHUNK or (size >= MIN_CHUNK and zlib.crc32(line) & BOUNDARY_MASK == 0):
+            yield data[start:start + size]
+            start += size
+            size = 0
+    if size:
+        yield data[start:start + size]
+
+
+class BackupManager:
+    """Create, list, restore and prune incremental backups of a data directory
+    
+    Creating a backup needs the DatabaseManager that owns the directory, to
+    freeze writes while the files are read; the other operations do not.
+    """
+    
+    def __init__(self, data_path: str = "data", backup_path: Optional[str] = None, db=None):
+        self.db = db
+        self.data_path = Path(data_path)
+        self.backup_path = Path(backup_path) if backup_path else self.data_path.parent / "backups"
+        self.chunks_path = self.backup_path / "chunks"
+        self.manifests_path = self.backup_path / "manifests"
+        self.chunks_path.mkdir(parents=True, exist_ok=True)
+        self.manifests_path.mkdir(parents=True, exist_ok=True)
+    
+    def _chunk_file(self, digest: str) -> Path:
+        return self.chunks_path / digest[:2] / digest
+    
+    def _store_chunk(self, chunk: bytes) -> tuple:
+        """Store a chunk unless it already exists; returns (digest, bytes written)"""
+        digest = hashlib.sha256(chunk).hexdigest()
+        chunk_file = self._chunk_file(digest)
+        if chunk_file.exists():
+            return digest, 0
+        chunk_file.parent.mkdir(exist_ok=True)
+        compressed = zlib.compress(chunk, 6)
+        tmp_file = chunk_file.with_name(digest + ".tmp")
+        with open(tmp_file, 'wb') as f:
+            f.write(compressed)
+        os.replace(tmp_file, chunk_file)
+        return digest, len(compressed)
+    
+    def _read_chunk(self, digest: str) -> bytes:
+        with open(self._chunk_file(digest), 'rb') as f:
+            chunk = zlib.decompress(f.read())
+        if hashlib.sha256(chunk).hexdigest() != digest:
+            raise ValueError(f"Chunk {digest} is corrupt")
+        return chunk
+    
+    def _data_files(self, root: Path) -> Iterator[Path]:
+        """Yield the files of a data directory that belong in a backup"""
+        backup_root = self.backup_path.resolve()
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [
+                d for d in dirnames
+                if d not in EXCLUDED_DIRS and (Path(dirpath) / d).resolve() != backup_root
+            ]
+            for filename in filenames:
+                if not filename.endswith(EXCLUDED_SUFFIXES):
+                    yield Path(dirpath) / filename
+    
+    def _manifest_file(self, backup_id: str) -> Path:
+        return self.manifests_path / f"{backup_id}.json"
+    
+    def _load_manifest(self, backup_id: str) -> Dict[str, Any]:
+        try:
+            return codec.load_file(self._manifest_file(backup_id))
+        except FileNotFoundError:
+            raise KeyError(f"Backup not found: {backup_id}")
+    
+    def list_backups(self) -> List[Dict[str, Any]]:
+        """Get a summary of every backup, oldest first"""
+        backups = []
+        for manifest_file in self.manifests_path.glob("*.json"):
+            manifest = codec.load_file(manifest_file)
+            backups.append({
+                "id": manifest["id"],
+                "created_at": manifest["created_at"],
+                "files": len(manifest["files"]),
+                "size": sum(entry["size"] for entry in manifest["files"].values()),
+                "new_bytes": manifest["new_bytes"]
+            })
+        # Ids only have second resolution, so order by the full timestamp
+        backups.sort(key=lambda backup: backup["created_at"])
+        return backups
+    
+    def create_backup(self) -> Dict[str, Any]:
+        """Take a consistent backup, storing only chunks not already stored"""
+        if self.db is None:
+            raise ValueError("Creating a backup needs the DatabaseManager of the data directory")
+        backups = self.list_backups()
+        previous = self._load_manifest(backups[-1]["id"])["files"] if backups else {}
+        backup_id = datetime.now().strftime("%Y%m%d-%H%M%S")
+        suffix = 1
+        while self._manifest_file(backup_id).exists():
+            suffix += 1
+            backup_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{suffix}"
+        
+        files: Dict[str, Any] = {}
+        new_bytes = 0
+        reused = 0
+        started = time.perf_counter()
+        with self.db.frozen():
+            for file_path in self._data_files(self.data_path):
+                relative = file_path.relative_to(self.data_path).as_posix()
+                stat = file_path.stat()
+                entry = previous.get(relative)
+                if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                    files[relative] = entry
+                    reused += 1
+                    continue
+                with open(file_path, 'rb') as f:
+                    data = f.read()
+                chunks = []
+                for chunk in chunk_lines(data):
+                    digest, written = self._store_chunk(chunk)
+                    chunks.append(digest)
+                    new_bytes += written
+                files[relative] = {"size": len(data), "mtime_ns": stat.st_mtime_ns, "chunks": chunks}
+        
+        manifest = {
+            "id": backup_id,
+            "created_at": datetime.now().isoformat(),
+            "new_bytes": new_bytes,
+            "files": files
+        }
+        tmp_file = self._manifest_file(backup_id).with_suffix(".tmp")
+        codec.dump_file(tmp_file, manifest, pretty=False)
+        os.replace(tmp_file, self._manifest_file(backup_id))
+        elapsed = time.perf_counter() - started
+        print(f"[Backup] {backup_id}: {len(files)} files ({reused} unchanged), "
+              f"{new_bytes / 1024:.1f} KB new, {elapsed:.2f}s")
+        return {"id": backup_id, "files": len(files), "unchanged": reused, "new_bytes": new_bytes}
+    
+    def restore_backup(self, backup_id: str, target: str, force: bool = False) -> int:
+        """Rebuild a data directory from a backup; returns the number of files written
+        
+        The target must be empty unless `force` is set, in which case files
+        not in the backup are removed so the result matches it exactly.
+        Raises StoreInUse while a Far-Bot process has the target open.
+        """
+        manifest = self._load_manifest(backup_id)
+        target_path = Path(target)
+        # A running DatabaseManager would overwrite the restored files from memory or its WAL
+        store_lock = try_lock(target_path / ".locks" / "store.lock")
+        if store_lock is None:
+            raise StoreInUse(f"{target} is in use by a running Far-Bot; stop it before restoring")
+        try:
+            return self._restore_files(backup_id, manifest, target, force)
+        finally:
+            release_lock(store_lock)
+    
+    def _restore_files(self, backup_id: str, manifest: Dict[str, Any], target: str, force: bool) -> int:
+        """Write a backup's files into the target; caller holds the target's store lock"""
+        target_path = Path(target)
+        existing = list(self._data_files(target_path))
+        if existing and not force:
+            raise FileExistsError(f"{target} is not empty; pass force to overwrite it")
+        
+        for relative, entry in manifest["files"].items():
+            file_path = target_path / relative
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = file_path.with_name(file_path.name + ".tmp")
+            with open(tmp_file, 'wb') as f:
+                for digest in entry["chunks"]:
+                    f.write(self._read_chunk(digest))
+            os.replace(tmp_file, file_path)
+        
+        for file_path in existing:
+            if file_path.relative_to(target_path).as_posix() not in manifest["files"]:
+                file_path.unlink()
+        # Derived files would describe the old contents, and an old WAL would be replayed
+        shutil.rmtree(target_path / "snapshots", ignore_errors=True)
+        for suffix in EXCLUDED_SUFFIXES[1:]:
+            for stale in target_path.glob(f"*{suffix}"):
+                stale.unlink()
+        print(f"[Backup] Restored {backup_id} into {target} ({len(manifest['files'])} files)")
+        return len(manifest["files"])
+    
+    def prune(self, keep: int) -> int:
+        """Delete all but the newest `keep` backups and the chunks only they used"""
+        backups = self.list_backups()
+        for backup in backups[:max(len(backups) - keep, 0)]:
+            self._manifest_file(backup["id"]).unlink()
+        
+        referenced = set()
+        for backup in self.list_backups():
+            for entry in self._load_manifest(backup["id"])["files"].values():
+                referenced.update(entry["chunks"])
+        removed = 0
+        for chunk_file in self.chunks_path.glob("*/*"):
+            if chunk_file.name not in referenced:
+                chunk_file.unlink()
+                removed += 1
+        print(f"[Backup] Pruned to {min(keep, len(backups))} backups, removed {removed} chunks")
+        return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Far-Bot data backups")
+    parser.add_argument("--data", default="data", help="data directory (default: data)")
+    parser.add_argument("--backups", default=None, help="backup directory (default: backups next to data)")
+    sub = parser.add_subparsers(dest="action", required=True)
+    sub.add_parser("create", help="take a backup now")
+    sub.add_parser("list", help="list backups")
+    restore = sub.add_parser("restore", help="restore a backup into a directory")
+    restore.add_argument("backup_id")
+    restore.add_argument("--target", required=True)
+    restore.add_argument("--force", action="store_true", help="overwrite a non-empty target")
+    prune = sub.add_parser("prune", help="keep only the newest backups")
+    prune.add_argument("--keep", type=int, required=True)
+    args = parser.parse_args()
+    
+    db = None
+    try:
+        backups = BackupManager(args.data, args.backups)
+        if args.action == "create":
+            from backend.database import DatabaseManager
+            try:
+                db = backups.db = DatabaseManager(db_path=args.data)
+            except StoreInUse as e:
+                # A second manager would miss the server's queued writes (and could compact its journal)
+                raise ValueError(f"{e}; create the backup through the running server: POST /api/backups")
+            backups.create_backup()
+        elif args.action == "list":
+            for backup in backups.list_backups():
+                print(f"{backup['id']}  {backup['created_at']}  {backup['files']:>5} files  "
+                      f"{backup['size'] / 1024:>10.1f} KB  {backup['new_bytes'] / 1024:>8.1f} KB new")
+        elif args.action == "restore":
+            backups.restore_backup(args.backup_id, args.target, args.force)
+        elif args.action == "prune":
+            backups.prune(args.keep)
+    except (KeyError, FileExistsError, ValueError, StoreInUse) as e:
+        print(f"[Backup] {e}")
+        sys.exit(1)
+    finally:
+        if db is not None:
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
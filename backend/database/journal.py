@@ -0,0 +1,159 @@
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from backend.database.backends import JSONBackend, apply_op, op_document, touched_documents
+from backend.utils.json_codec import codec
+
+
+class JournalBackend(JSONBackend):
+    """Log-structured variant of the JSON backend
+    
+    Every mutation is appended to a journal segment as one JSON line, so a
+    write costs the size of the change. Once enough records pile up the
+    active segment is sealed and a background thread compacts it into the
+    regular snapshot files
+    (bots.json, config.json, commands/<bot_id>.json), which are replaced
+    atomically. Loading replays the snapshot plus every remaining segment;
+    ops are full-record puts and deletes, so replaying a segment that was
+    already compacted is harmless.
+    
+    Compaction only deletes segments this instance sealed. Segments found at
+    startup are left by an earlier process and are only deleted when the
+    caller holds the data directory exclusively (`exclusive`); otherwise they
+    may be another live process's active segment.
+    """
+    
+    name = "journal"
+    
+    def __init__(self, db_path: Path, compact_every: int = 1000, fsync: bool = False,
+                 exclusive: bool = False):
+        super().__init__(db_path)
+        self.journal_path = self.db_path / "journal"
+        self.journal_path.mkdir(exist_ok=True)
+        self.compact_every = compact_every
+        self.fsync = fsync
+        
+        self._lock = threading.RLock()
+        self._dirty: set = set()
+        self._records = 0
+        self._compactor: Optional[threading.Thread] = None
+        
+        segments = self._segments()
+        self._segment = segments[-1] + 1 if segments else 1
+        # Segments compaction may delete: those sealed here, plus recovered ones when exclusive
+        self._owned: set = set(segments) if exclusive else set()
+        self._dirty.update(self._segment_documents(segments))
+        self._journal = open(self._segment_file(self._segment), 'ab')
+    
+    def _segment_file(self, segment: int) -> Path:
+        return self.journal_path / f"{segment:08d}.log"
+    
+    def _segments(self) -> List[int]:
+        """Get the numbers of the segments on disk, oldest first"""
+        return sorted(int(p.stem) for p in self.journal_path.glob("*.log") if p.stem.isdigit())
+    
+    def _read_segment(self, segment: int):
+        """Yield the ops stored in a segment, skipping a torn final record"""
+        with open(self._segment_file(segment), 'rb') as f:
+            for line in f:
+                try:
+                    record = codec.loads(line)
+                except ValueError:
+                    print(f"[DB] Ignoring incomplete journal record in segment {segment}")
+                    break
+                yield from record["ops"]
+    
+    def _segment_documents(self, segments: List[int]) -> set:
+        """Get the documents touched by a set of segments"""
+        names = set()
+        for segment in segments:
+            for op in self._read_segment(segment):
+                names.add(op_document(op))
+        return names
+    
+    def _replay(self, name: str, upto: Optional[int] = None) -> Dict[str, Any]:
+        """Rebuild a document from its snapshot and the journal segments"""
+        documents = {name: super().load(name)}
+        for segment in self._segments():
+            if upto is not None and segment > upto:
+                break
+            for op in self._read_segment(segment):
+                if op_document(op) == name:
+                    apply_op(documents, op)
+        return documents[name]
+    
+    def load(self, name: str) -> Dict[str, Any]:
+        with self._lock:
+            return self._replay(name)
+    
+    def signature(self, name: str) -> Optional[tuple]:
+        # The journal has a single writer, so there is nothing to revalidate
+        return None
+    
+    def write(self, ops: List[Dict[str, Any]], documents: Dict[str, Dict[str, Any]]):
+        with self._lock:
+            self._journal.write(codec.dumps({"ops": ops}) + b"\n")
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+            self._dirty.update(touched_documents(ops))
+            self._records += 1
+            if self._records >= self.compact_every and not self._compacting():
+                self._start_compaction()
+    
+    def _compacting(self) -> bool:
+        return self._compactor is not None and self._compactor.is_alive()
+    
+    def _seal(self, reopen: bool = True):
+        """Seal the active segment and start a new one"""
+        sealed = self._segment
+        self._owned.add(sealed)
+        self._journal.close()
+        self._segment += 1
+        if reopen:
+            self._journal = open(self._segment_file(self._segment), 'ab')
+        dirty, self._dirty, self._records = self._dirty, set(), 0
+        return dirty, sealed
+    
+    def _start_compaction(self):
+        """Compact the sealed segments in the background"""
+        dirty, sealed = self._seal()
+        self._compactor = threading.Thread(target=self._compact, args=(dirty, sealed), daemon=True)
+        self._compactor.start()
+    
+    def _compact(self, dirty: set, sealed: int):
+        """Write fresh snapshot files and drop the segments they cover"""
+        try:
+            # Sealed segments are immutable, so replaying them needs no lock
+            documents = {name: self._replay(name, upto=sealed) for name in dirty}
+            with self._lock:
+                for name, document in documents.items():
+                    self._save_json(self._document_file(name), document)
+                for segment in sorted(self._owned):
+                    if segment <= sealed:
+                        os.remove(self._segment_file(segment))
+                        self._owned.discard(segment)
+            print(f"[DB] Journal compacted up to segment {sealed}")
+        except Exception as e:
+            # Segments are kept, so nothing is lost; the next compaction retries
+            with self._lock:
+                self._dirty.update(dirty)
+            print(f"[DB] Error compacting journal: {e}")
+    
+    def compact(self, reopen: bool = True):
+        """Compact the journal synchronously"""
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        with self._lock:
+            dirty, sealed = self._seal(reopen)
+            self._compact(dirty, sealed)
+    
+    def checkpoint(self):
+        # Fold every segment into the snapshot files so a copy needs no replay
+        self.compact()
+    
+    def close(self):
+        self.compact(reopen=False)
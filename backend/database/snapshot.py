@@ -0,0 +1,138 @@
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import quote
+
+from backend.utils.json_codec import codec
+
+
+MAGIC = b"FBSNAP01"
+_U32 = struct.Struct("<I")
+_ENTRY = struct.Struct("<III")  # key length, value offset, value length
+
+
+class CatalogSnapshot:
+    """Read-only, memory-mapped snapshot of one bot's command catalog
+    
+    Layout: magic, the source signature (length-prefixed JSON), the record
+    count, an index of (key length, offset, length) + key entries and then
+    the catalog itself as one compact JSON object. Loading everything is a
+    single parse of that object; fetching one command decodes only its own
+    slice of it.
+    """
+    
+    def __init__(self, file_path: Path):
+        with open(file_path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_index()
+        except (ValueError, struct.error):
+            self.close()
+            raise ValueError(f"Corrupt snapshot: {file_path.name}")
+    
+    def _read_index(self):
+        mm = self._mm
+        if mm[:len(MAGIC)] != MAGIC:
+            raise ValueError("bad magic")
+        pos = len(MAGIC)
+        (length,) = _U32.unpack_from(mm, pos)
+        pos += _U32.size
+        self.signature = tuple(codec.loads(mm[pos:pos + length]))
+        pos += length
+        (count,) = _U32.unpack_from(mm, pos)
+        pos += _U32.size
+        entries = []
+        for _ in range(count):
+            key_length, offset, length = _ENTRY.unpack_from(mm, pos)
+            pos += _ENTRY.size
+            entries.append((mm[pos:pos + key_length].decode('utf-8'), offset, length))
+            pos += key_length
+        (data_length,) = _U32.unpack_from(mm, pos)
+        pos += _U32.size
+        self._data_start = pos
+        self._data_end = pos + data_length
+        if self._data_end > len(mm):
+            raise ValueError("truncated")
+        self._index = {key: (pos + offset, length) for key, offset, length in entries}
+    
+    def __len__(self) -> int:
+        return len(self._index)
+    
+    def __contains__(self, command_id: str) -> bool:
+        return command_id in self._index
+    
+    def keys(self) -> Iterator[str]:
+        return iter(self._index)
+    
+    def get(self, command_id: str) -> Optional[Dict[str, Any]]:
+        """Decode a single command"""
+        entry = self._index.get(command_id)
+        if entry is None:
+            return None
+        offset, length = entry
+        return codec.loads(self._mm[offset:offset + length])
+    
+    def load_all(self) -> Dict[str, Any]:
+        """Decode the whole catalog"""
+        return codec.loads(self._mm[self._data_start:self._data_end])
+    
+    def close(self):
+        self._mm.close()
+
+
+class SnapshotStore:
+    """Binary catalog snapshots under data/snapshots/, one file per bot"""
+    
+    def __init__(self, db_path: Path):
+        self.path = Path(db_path) / "snapshots"
+        self.path.mkdir(exist_ok=True)
+    
+    def _file(self, bot_id: str) -> Path:
+        filename = quote(bot_id, safe="")
+        if filename.startswith("."):
+            filename = "%2E" + filename[1:]
+        return self.path / f"{filename}.snap"
+    
+    def write(self, bot_id: str, catalog: Dict[str, Any], signature: tuple):
+        """Write a catalog snapshot atomically, tagged with its source signature"""
+        values: List[bytes] = []
+        index: List[bytes] = []
+        offset = 1  # past the opening brace
+        for command_id, command in catalog.items():
+            key = codec.dumps(command_id)
+            value = codec.dumps(command)
+            offset += len(key) + 1
+            encoded_id = command_id.encode('utf-8')
+            index.append(_ENTRY.pack(len(encoded_id), offset, len(value)) + encoded_id)
+            values.append(key + b":" + value)
+            offset += len(value) + 1
+        data = b"{" + b",".join(values) + b"}"
+        header = codec.dumps(list(signature))
+        
+        tmp_path = self._file(bot_id).with_suffix(".snap.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(_U32.pack(len(header)) + header)
+            f.write(_U32.pack(len(index)))
+            f.write(b"".join(index))
+            f.write(_U32.pack(len(data)) + data)
+        os.replace(tmp_path, self._file(bot_id))
+    
+    def open(self, bot_id: str, signature: tuple) -> Optional[CatalogSnapshot]:
+        """Open a bot's snapshot if it matches the current source signature"""
+        try:
+            snapshot = CatalogSnapshot(self._file(bot_id))
+        except (FileNotFoundError, ValueError):
+            return None
+        if snapshot.signature != tuple(signature):
+            snapshot.close()
+            return None
+        return snapshot
+    
+    def remove(self, bot_id: str):
+        try:
+            os.remove(self._file(bot_id))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,165 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import unquote
+
+from backend.database.backends import StorageBackend
+from backend.utils.json_codec import codec
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bots (
+    bot_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS commands (
+    bot_id TEXT NOT NULL,
+    command_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (bot_id, command_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS config (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _encode(value: Any) -> str:
+    """Encode a row value as compact JSON text"""
+    return codec.dumps(value).decode('utf-8')
+
+
+class SQLiteBackend(StorageBackend):
+    """SQLite backend: one row per bot, command and config key
+    
+    Changing a command rewrites a single row instead of the whole
+    commands document. The database runs in WAL mode so readers never
+    block the writer.
+    """
+    
+    name = "sqlite"
+    
+    def __init__(self, db_path: Path, filename: str = "far-bot.db"):
+        self.db_path = Path(db_path)
+        self.db_file = self.db_path / filename
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        # Serialize with other processes opening the same store for the first time
+        with self.lock("migration"):
+            self.migrate_from_json()
+    
+    def migrate_from_json(self) -> bool:
+        """One-shot import of bots.json, commands.json and config.json"""
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'migrated_from_json'").fetchone()
+            if row:
+                return False
+            
+            documents = {}
+            for name in ("bots", "commands", "config"):
+                file_path = self.db_path / f"{name}.json"
+                try:
+                    documents[name] = codec.load_file(file_path)
+                except (ValueError, FileNotFoundError):
+                    documents[name] = {}
+            
+            # Per-bot command files written by the JSON backend
+            commands_path = self.db_path / "commands"
+            if commands_path.is_dir():
+                for shard in commands_path.glob("*.json"):
+                    try:
+                        documents["commands"][unquote(shard.stem)] = codec.load_file(shard)
+                    except ValueError:
+                        print(f"[DB] Skipping unreadable command file {shard.name}")
+            
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO bots (bot_id, data) VALUES (?, ?)",
+                    [(bot_id, _encode(bot)) for bot_id, bot in documents["bots"].items()]
+                )
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO commands (bot_id, command_id, data) VALUES (?, ?, ?)",
+                    [
+                        (bot_id, cmd_id, _encode(cmd))
+                        for bot_id, catalog in documents["commands"].items()
+                        for cmd_id, cmd in catalog.items()
+                    ]
+                )
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)",
+                    [(key, _encode(value)) for key, value in documents["config"].items()]
+                )
+                self.conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_from_json', '1')")
+            
+            migrated = sum(len(catalog) for catalog in documents["commands"].values())
+            print(f"[DB] Migrated {len(documents['bots'])} bots and {migrated} commands to SQLite")
+            return True
+    
+    def load(self, name: str) -> Dict[str, Any]:
+        with self._lock:
+            if name == "bots":
+                rows = self.conn.execute("SELECT bot_id, data FROM bots")
+                return {bot_id: codec.loads(data) for bot_id, data in rows}
+            if name.startswith("commands/"):
+                rows = self.conn.execute(
+                    "SELECT command_id, data FROM commands WHERE bot_id = ?",
+                    (name[len("commands/"):],)
+                )
+                return {cmd_id: codec.loads(data) for cmd_id, data in rows}
+            if name == "config":
+                rows = self.conn.execute("SELECT key, value FROM config")
+                return {key: codec.loads(value) for key, value in rows}
+        raise KeyError(name)
+    
+    def signature(self, name: str) -> Optional[tuple]:
+        # data_version only moves when another connection commits
+        with self._lock:
+            return self.conn.execute("PRAGMA data_version").fetchone()
+    
+    def write(self, ops: List[Dict[str, Any]], documents: Dict[str, Dict[str, Any]]):
+        with self._lock, self.conn:
+            for op in ops:
+                kind = op["op"]
+                if kind == "put_bot":
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO bots (bot_id, data) VALUES (?, ?)",
+                        (op["bot_id"], _encode(op["data"]))
+                    )
+                elif kind == "delete_bot":
+                    self.conn.execute("DELETE FROM bots WHERE bot_id = ?", (op["bot_id"],))
+                elif kind == "put_command":
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO commands (bot_id, command_id, data) VALUES (?, ?, ?)",
+                        (op["bot_id"], op["command_id"], _encode(op["data"]))
+                    )
+                elif kind == "delete_command":
+                    self.conn.execute(
+                        "DELETE FROM commands WHERE bot_id = ? AND command_id = ?",
+                        (op["bot_id"], op["command_id"])
+                    )
+                elif kind == "put_config":
+                    self.conn.execute("DELETE FROM config")
+                    self.conn.executemany(
+                        "INSERT INTO config (key, value) VALUES (?, ?)",
+                        [(key, _encode(value)) for key, value in op["data"].items()]
+                    )
+    
+    def checkpoint(self):
+        # Move the WAL into the main file so far-bot.db alone is a complete copy
+        with self._lock:
+            busy, _, _ = self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        if busy:
+            raise RuntimeError("SQLite checkpoint blocked by another connection")
+    
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Longest traceback kept as a group's sample
+MAX_SAMPLE_CHARS = 4000
+
+
+def unwrap(error: BaseException) -> BaseException:
+    """Get the exception user code raised from discord.py's invoke wrappers"""
+    while getattr(error, "original", None) is not None:
+        error = error.original
+    return error
+
+
+def fingerprint(error: BaseException) -> str:
+    """Identify an error by its type and the functions it passed through
+    
+    Line numbers and messages are left out, so the same failure still groups
+    together after a command is edited or when it carries different values.
+    """
+    parts = [f"{type(error).__module__}.{type(error).__qualname__}"]
+    for frame in traceback.extract_tb(error.__traceback__):
+        parts.append(f"{os.path.basename(frame.filename)}:{frame.name}")
+    return hashlib.sha1("|".join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+class ErrorTracker:
+    """Group command errors by fingerprint, per bot
+    
+    Each group keeps a count, first and last seen times and one sample
+    (message, traceback and command of its first occurrence), so a flood of
+    identical errors costs O(1) memory. At most `max_groups` groups are kept
+    per bot; the one seen least recently is dropped first.
+    """
+    
+    def __init__(self, max_groups: int = 50):
+        self.max_groups = max_groups
+        # bot_id -> fingerprint -> group, least recently seen first
+        self._groups: Dict[str, OrderedDict] = {}
+        self._lock = threading.Lock()
+    
+    def record(self, bot_id: str, error: BaseException, command: Optional[str] = None) -> Dict[str, Any]:
+        """Count an error in its group; returns a copy of the group"""
+        error = unwrap(error)
+        key = fingerprint(error)
+        now = time.time()
+        with self._lock:
+            groups = self._groups.get(bot_id)
+            if groups is None:
+                groups = self._groups[bot_id] = OrderedDict()
+            group = groups.get(key)
+            if group is None:
+                sample = "".join(traceback.format_exception(type(error), error, error.__traceback__))
+                group = groups[key] = {
+                    "fingerprint": key,
+                    "type": type(error).__name__,
+                    "message": str(error)[:500],
+                    "traceback": sample[-MAX_SAMPLE_CHARS:],
+                    "command": command,
+                    "count": 0,
+                    "first_seen": now,
+                    "last_seen": now
+                }
+                while len(groups) > self.max_groups:
+                    groups.popitem(last=False)
+            group["count"] += 1
+            group["last_seen"] = now
+            groups.move_to_end(key)
+            return dict(group)
+    
+    @staticmethod
+    def _format(group: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            **group,
+            "first_seen": datetime.fromtimestamp(group["first_seen"]).isoformat(),
+            "last_seen": datetime.fromtimestamp(group["last_seen"]).isoformat()
+        }
+    
+    def get_groups(self, bot_id: str) -> List[Dict[str, Any]]:
+        """Get a bot's error groups, most recently seen first"""
+        with self._lock:
+            groups = list(self._groups.get(bot_id, {}).values())
+        return [self._format(group) for group in reversed(groups)]
+    
+    def clear(self, bot_id: str):
+        """Forget a bot's error groups"""
+        with self._lock:
+            self._groups.pop(bot_id, None)
+    
+    @staticmethod
+    def should_log(count: int) -> bool:
+        """Log the 1st, 10th, 100th... occurrence of a group instead of every one"""
+        while count % 10 == 0:
+            count //= 10
+        return count == 1
@@ -1,8 +1,26 @@
 import logging
 import os
+import threading
+from collections import deque
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
+
+from backend.utils.json_codec import codec
+
+class LogVolume(logging.Handler):
+    """Counts log records by level, for the metrics endpoint"""
+    
+    def __init__(self):
+        super().__init__()
+        self.counts = {}
+    
+    def emit(self, record: logging.LogRecord):
+        self.counts[record.levelname] = self.counts.get(record.levelname, 0) + 1
+
+# Installed on the root logger by FarBotLogger, so library records are counted too
+log_volume = LogVolume()
 
 class FarBotLogger:
     """Logging system for Far-Bot"""
@@ -15,10 +33,17 @@ class FarBotLogger:
         'critical': logging.CRITICAL
     }
     
+    # Entries kept in memory overall and per bot
+    MAX_LOGS = 1000
+    MAX_BOT_LOGS = 200
+    
     def __init__(self, log_dir: str = "logs"):
         self.log_dir = Path(log_dir)
         self.log_dir.mkdir(exist_ok=True)
-        self.logs = []
+        self.logs = deque(maxlen=self.MAX_LOGS)
+        # Per-bot tails, so a bot's logs are served without scanning everyone else's
+        self.bot_logs: Dict[str, deque] = {}
+        self._lock = threading.Lock()
         self._setup_logging()
     
     def _setup_logging(self):
@@ -30,7 +55,8 @@ class FarBotLogger:
             format='[%(asctime)s] [%(levelname)s] %(message)s',
             handlers=[
                 logging.FileHandler(log_file),
-                logging.StreamHandler()
+                logging.StreamHandler(),
+                log_volume
             ]
         )
         
@@ -46,14 +72,16 @@ class FarBotLogger:
             'bot_id': bot_id
         }
         
-        self.logs.append(log_entry)
-        
-        # Keep last 1000 logs in memory
-        if len(self.logs) > 1000:
-            self.logs.pop(0)
+        with self._lock:
+            self.logs.append(log_entry)
+            if bot_id:
+                bot_logs = self.bot_logs.get(bot_id)
+                if bot_logs is None:
+                    bot_logs = self.bot_logs[bot_id] = deque(maxlen=self.MAX_BOT_LOGS)
+                bot_logs.append(log_entry)
         
         log_method = getattr(self.logger, level.lower(), self.logger.info)
-        log_method(f"[{bot_id}]" if bot_id else "" + f" {message}")
+        log_method(f"[{bot_id}] {message}" if bot_id else message)
     
     def debug(self, message: str, bot_id: Optional[str] = None):
         self.log('debug', message, bot_id)
@@ -76,28 +104,30 @@ class FarBotLogger:
     
     def get_logs(self, limit: int = 100, level: Optional[str] = None, 
                  bot_id: Optional[str] = None) -> list:
-        """Get logs with optional filtering"""
-        filtered = self.logs
-        
-        if level:
-            filtered = [log for log in filtered if log['level'].lower() == level.lower()]
-        
-        if bot_id:
-            filtered = [log for log in filtered if log['bot_id'] == bot_id]
-        
-        return filtered[-limit:]
+        """Get the newest logs, oldest first, with optional filtering"""
+        with self._lock:
+            source = self.bot_logs.get(bot_id, ()) if bot_id else self.logs
+            # Walk back from the newest entry and stop once there are enough
+            newest = reversed(source)
+            if level:
+                newest = (log for log in newest if log['level'].lower() == level.lower())
+            result = list(islice(newest, max(limit, 0)))
+        result.reverse()
+        return result
     
     def clear_logs(self):
         """Clear in-memory logs"""
-        self.logs = []
+        with self._lock:
+            self.logs.clear()
+            self.bot_logs.clear()
     
     def export_logs(self, filename: str = "logs_export.json") -> bool:
         """Export logs to JSON file"""
         try:
-            import json
             export_file = self.log_dir / filename
-            with open(export_file, 'w') as f:
-                json.dump(self.logs, f, indent=2)
+            with self._lock:
+                logs = list(self.logs)
+            codec.dump_file(export_file, logs, pretty=True)
             return True
         except Exception as e:
             self.error(f"Failed to export logs: {e}")
@@ -0,0 +1,129 @@
+"""
+Prometheus / OpenMetrics exposition for Far-Bot
+
+Everything is read from in-memory state (StatsTracker counters, running
+bot instances, DatabaseManager histograms and the log volume handler), so
+a scrape costs O(metrics) and never touches stats.json or the panel API.
+"""
+
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from backend.logger import log_volume
+from backend.utils.histogram import LatencyHistogram
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+class MetricsWriter:
+    """Builds the text exposition, in Prometheus 0.0.4 or OpenMetrics 1.0 flavour"""
+    
+    def __init__(self, openmetrics: bool = False):
+        self.openmetrics = openmetrics
+        self._lines: List[str] = []
+    
+    def _family(self, name: str, kind: str, help_text: str):
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} {kind}")
+    
+    def _sample(self, name: str, labels: Dict[str, str], value: float):
+        if labels:
+            rendered = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+            self._lines.append(f"{name}{{{rendered}}} {_format_value(value)}")
+        else:
+            self._lines.append(f"{name} {_format_value(value)}")
+    
+    def gauge(self, name: str, help_text: str, samples: Iterable[Tuple[Dict[str, str], float]]):
+        self._family(name, "gauge", help_text)
+        for labels, value in samples:
+            self._sample(name, labels, value)
+    
+    def counter(self, name: str, help_text: str, samples: Iterable[Tuple[Dict[str, str], float]]):
+        """`name` without the _total suffix, which OpenMetrics leaves out of the family name"""
+        self._family(name if self.openmetrics else f"{name}_total", "counter", help_text)
+        for labels, value in samples:
+            self._sample(f"{name}_total", labels, value)
+    
+    def summary(self, name: str, help_text: str, histograms: Iterable[Tuple[Dict[str, str], LatencyHistogram]]):
+        """Quantiles, sum and count of latency histograms, in seconds"""
+        self._family(name, "summary", help_text)
+        for labels, histogram in histograms:
+            for q in QUANTILES:
+                value = histogram.percentile(q * 100)
+                self._sample(name, {**labels, "quantile": str(q)}, math.nan if value is None else value)
+            self._sample(f"{name}_sum", labels, histogram.total)
+            self._sample(f"{name}_count", labels, histogram.count)
+    
+    def render(self) -> str:
+        lines = self._lines + ["# EOF"] if self.openmetrics else self._lines
+        return "\n".join(lines) + "\n"
+
+
+def render_metrics(db, bot_manager, openmetrics: bool = False) -> str:
+    """Render every Far-Bot metric in the text exposition format"""
+    writer = MetricsWriter(openmetrics)
+    bots = dict(bot_manager.active_bots)
+    stats = bot_manager.stats
+    
+    writer.gauge("far_bot_bots_running", "Bots currently running", [
+        ({}, sum(1 for instance in bots.values() if instance.is_running))
+    ])
+    writer.gauge("far_bot_gateway_latency_seconds", "Discord gateway heartbeat latency", [
+        ({"bot": bot_id}, instance.bot.latency)
+        for bot_id, instance in bots.items()
+        if instance.is_ready and not math.isnan(instance.bot.latency)
+    ])
+    writer.gauge("far_bot_event_loop_lag_seconds", "How late the bot's event loop last ran a timer", [
+        ({"bot": bot_id}, instance.loop_lag) for bot_id, instance in bots.items()
+    ])
+    
+    counters = stats.get_counters()
+    writer.counter("far_bot_command_executions", "Commands completed", [
+        ({"bot": bot_id}, commands_run) for bot_id, (commands_run, _) in counters.items()
+    ])
+    writer.counter("far_bot_command_errors", "Commands that raised an error", [
+        ({"bot": bot_id}, errors) for bot_id, (_, errors) in counters.items()
+    ])
+    writer.summary("far_bot_command_duration_seconds", "Command latency, end to end", [
+        ({"bot": bot_id}, histogram) for bot_id, histogram in stats.get_bot_histograms().items()
+    ])
+    
+    cache = db.get_cache_stats()
+    writer.summary("far_bot_db_operation_seconds", "Storage operation latency", [
+        ({"op": op}, histogram) for op, histogram in db.get_op_timings().items()
+    ])
+    writer.counter("far_bot_db_cache_hits", "Document lookups served from memory", [({}, cache["hits"])])
+    writer.counter("far_bot_db_cache_misses", "Document lookups that loaded from storage", [({}, cache["misses"])])
+    writer.counter("far_bot_db_disk_writes", "Writes persisted to storage", [({}, cache["disk_writes"])])
+    writer.counter("far_bot_db_evictions", "Command catalogs evicted from memory", [({}, cache["evictions"])])
+    if cache["resident_bytes"] is not None:
+        writer.gauge("far_bot_db_resident_bytes", "Approximate size of resident command catalogs", [
+            ({}, cache["resident_bytes"])
+        ])
+    writer.gauge("far_bot_db_pending_ops", "Writes queued for the next flush", [({}, cache["pending_ops"])])
+    
+    writer.counter("far_bot_log_messages", "Log records emitted", [
+        ({"level": level}, count) for level, count in sorted(dict(log_volume.counts).items())
+    ])
+    return writer.render()
+
+
+def wants_openmetrics(accept: Optional[str]) -> bool:
+    """Whether the scraper's Accept header asks for OpenMetrics"""
+    return bool(accept) and "application/openmetrics-text" in accept
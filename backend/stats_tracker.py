@@ -1,38 +1,448 @@
-from datetime import datetime, timedelta
-from typing import Dict, Any
+import atexit
+import heapq
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, List, Optional
 from backend.database import DatabaseManager
+from backend.utils.heavy_hitters import WindowedTopK, merge_top
+from backend.utils.histogram import LatencyHistogram
+from backend.utils.hyperloglog import HyperLogLog
+from backend.utils.timeseries import ActivitySeries
+
+BOT_METRICS = ("executions", "errors", "messages")
+COMMAND_METRICS = ("executions", "errors")
+# What the top-K trackers rank, per bot and guild, over the last hour
+TOP_DIMENSIONS = ("commands", "users", "channels")
+TOP_WINDOW = 3600
+
+_DISTINCT_MAGIC = b"FBHLL001"
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+
+
+class DistinctUsers:
+    """Approximate unique users per (bot, guild, command, day)
+    
+    One HyperLogLog per key, persisted as one zlib-compressed binary file per
+    day under data/distinct/, so a flush only rewrites the days that changed.
+    Days older than `retention_days` are dropped. Not thread-safe; the
+    StatsTracker lock guards it.
+    """
+    
+    def __init__(self, path: Path, retention_days: int = 30):
+        self.path = path
+        self.path.mkdir(exist_ok=True)
+        self.retention_days = retention_days
+        # day -> (bot_id, guild_id, command) -> sketch
+        self._days: Dict[str, Dict[tuple, HyperLogLog]] = {}
+        self._dirty_days: set = set()
+        self._load()
+    
+    def _cutoff(self) -> str:
+        return (date.today() - timedelta(days=self.retention_days - 1)).isoformat()
+    
+    def _load(self):
+        cutoff = self._cutoff()
+        for day_file in sorted(self.path.glob("*.bin")):
+            if day_file.stem < cutoff:
+                continue
+            try:
+                self._days[day_file.stem] = self._decode(day_file.read_bytes())
+            except (ValueError, struct.error, zlib.error) as e:
+                print(f"[Stats] Skipping unreadable {day_file.name}: {e}")
+    
+    @staticmethod
+    def _encode(sketches: Dict[tuple, HyperLogLog]) -> bytes:
+        parts = []
+        for key, sketch in sketches.items():
+            for field in key:
+                encoded = field.encode('utf-8')
+                parts.append(_U16.pack(len(encoded)) + encoded)
+            data = sketch.to_bytes()
+            parts.append(_U32.pack(len(data)) + data)
+        return _DISTINCT_MAGIC + zlib.compress(b"".join(parts), 6)
+    
+    @staticmethod
+    def _decode(data: bytes) -> Dict[tuple, HyperLogLog]:
+        if data[:len(_DISTINCT_MAGIC)] != _DISTINCT_MAGIC:
+            raise ValueError("bad magic")
+        payload = zlib.decompress(data[len(_DISTINCT_MAGIC):])
+        sketches = {}
+        pos = 0
+        while pos < len(payload):
+            fields = []
+            for _ in range(3):
+                (length,) = _U16.unpack_from(payload, pos)
+                pos += _U16.size
+                fields.append(payload[pos:pos + length].decode('utf-8'))
+                pos += length
+            (length,) = _U32.unpack_from(payload, pos)
+            pos += _U32.size
+            sketches[tuple(fields)] = HyperLogLog.from_bytes(payload[pos:pos + length])
+            pos += length
+        return sketches
+    
+    def add(self, bot_id: str, guild_id: str, command: str, user_id: str, day: str):
+        sketches = self._days.get(day)
+        if sketches is None:
+            sketches = self._days[day] = {}
+        key = (bot_id, guild_id, command)
+        sketch = sketches.get(key)
+        if sketch is None:
+            sketch = sketches[key] = HyperLogLog()
+        sketch.add(user_id)
+        self._dirty_days.add(day)
+    
+    def count(self, bot_id: str, days: List[str], guild_id: Optional[str] = None,
+              command: Optional[str] = None) -> Dict[str, Any]:
+        """Estimate unique users per day and over all the days together"""
+        def matching(day):
+            return [
+                sketch for (bot, guild, cmd), sketch in self._days.get(day, {}).items()
+                if bot == bot_id and guild_id in (None, guild) and command in (None, cmd)
+            ]
+        per_day = {day: HyperLogLog.merged(matching(day)) for day in days}
+        return {
+            "days": {day: sketch.count() for day, sketch in per_day.items()},
+            "total": HyperLogLog.merged(per_day.values()).count()
+        }
+    
+    def forget_bot(self, bot_id: str):
+        for day, sketches in self._days.items():
+            for key in [key for key in sketches if key[0] == bot_id]:
+                del sketches[key]
+                self._dirty_days.add(day)
+    
+    def take_dirty(self) -> Dict[str, Optional[bytes]]:
+        """Encode the days changed since the last call (None = delete the file)"""
+        cutoff = self._cutoff()
+        for day in [day for day, sketches in self._days.items() if day < cutoff or not sketches]:
+            del self._days[day]
+            self._dirty_days.add(day)
+        encoded = {
+            day: self._encode(self._days[day]) if day in self._days else None
+            for day in self._dirty_days
+        }
+        self._dirty_days = set()
+        return encoded
+    
+    def mark_dirty(self, days):
+        self._dirty_days.update(day for day in days if day in self._days)
+    
+    def write(self, encoded: Dict[str, Optional[bytes]]):
+        for day, data in encoded.items():
+            day_file = self.path / f"{day}.bin"
+            if data is None:
+                day_file.unlink(missing_ok=True)
+                continue
+            tmp_file = day_file.with_suffix(".tmp")
+            with open(tmp_file, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_file, day_file)
+
 
 class StatsTracker:
-    """Track bot and command statistics"""
+    """Track bot and command statistics
     
-    def __init__(self, db: DatabaseManager):
+    Counters live in memory and stats.json is only rewritten by a background
+    flush (every `flush_interval` seconds, when something changed) and on
+    close, so counting a command never touches the disk. Recent activity is
+    also kept per bot and per command in fixed-size time series (memory only),
+    and unique users per command and day in HyperLogLog sketches.
+    """
+    
+    def __init__(self, db: DatabaseManager, flush_interval: Optional[float] = None):
         self.db = db
         self.stats_file = db.db_path / "stats.json"
         if not self.stats_file.exists():
-            db._save_json(self.stats_file, {})
+            db._save_json(self.stats_file, {}, pretty=False)
+        
+        # bot_id -> {"commands_run", "errors", "last_active", "commands": {name: runs}}, seeded from disk once
+        self._stats: Dict[str, Dict[str, Any]] = self.db._load_json(self.stats_file)
+        # last_active as a timestamp; formatted only when read or flushed
+        self._last_active: Dict[str, float] = {}
+        self._activity: Dict[str, ActivitySeries] = {}
+        # (bot_id, command name) -> series, created on first use
+        self._command_activity: Dict[tuple, ActivitySeries] = {}
+        # bot_id -> command name -> latency histogram
+        self._latency: Dict[str, Dict[str, LatencyHistogram]] = {}
+        # bot_id -> guild_id -> dimension -> windowed heavy-hitter sketch
+        self._top: Dict[str, Dict[str, Dict[str, WindowedTopK]]] = {}
+        self._distinct = DistinctUsers(db.db_path / "distinct", db.settings.get("distinct_retention_days", 30))
+        self._lock = threading.Lock()
+        # Serializes writers so an older snapshot never lands after a newer one
+        self._flush_lock = threading.Lock()
+        self._dirty = False
+        
+        if flush_interval is None:
+            flush_interval = db.settings.get("stats_flush_interval", 10)
+        self.flush_interval = flush_interval
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+        atexit.register(self.flush)
+    
+    def _bot_stats(self, bot_id: str) -> Dict[str, Any]:
+        """Get a bot's counters, creating them; caller holds the lock"""
+        stats = self._stats.get(bot_id)
+        if stats is None:
+            stats = self._stats[bot_id] = {"commands_run": 0, "errors": 0, "last_active": None}
+        return stats
     
-    def increment_command_count(self, bot_id: str):
+    def _record(self, bot_id: str, command: Optional[str], metric: str, now: float):
+        """Add an event to the bot's and command's series; caller holds the lock"""
+        series = self._activity.get(bot_id)
+        if series is None:
+            series = self._activity[bot_id] = ActivitySeries(BOT_METRICS)
+        series.add(metric, now)
+        if command is not None:
+            key = (bot_id, command)
+            series = self._command_activity.get(key)
+            if series is None:
+                series = self._command_activity[key] = ActivitySeries(COMMAND_METRICS)
+            series.add(metric, now)
+    
+    def increment_command_count(self, bot_id: str, command: Optional[str] = None):
         """Increment command execution count"""
-        stats = self.db._load_json(self.stats_file)
-        if bot_id not in stats:
-            stats[bot_id] = {"commands_run": 0, "errors": 0, "last_active": None}
-        stats[bot_id]["commands_run"] += 1
-        stats[bot_id]["last_active"] = datetime.now().isoformat()
-        self.db._save_json(self.stats_file, stats)
-    
-    def increment_error_count(self, bot_id: str):
+        now = time.time()
+        with self._lock:
+            stats = self._bot_stats(bot_id)
+            stats["commands_run"] += 1
+            if command is not None:
+                counts = stats.get("commands")
+                if counts is None:
+                    counts = stats["commands"] = {}
+                counts[command] = counts.get(command, 0) + 1
+            self._last_active[bot_id] = now
+            self._record(bot_id, command, "executions", now)
+            self._dirty = True
+    
+    def increment_error_count(self, bot_id: str, command: Optional[str] = None):
         """Increment error count"""
-        stats = self.db._load_json(self.stats_file)
-        if bot_id not in stats:
-            stats[bot_id] = {"commands_run": 0, "errors": 0}
-        stats[bot_id]["errors"] += 1
-        self.db._save_json(self.stats_file, stats)
+        now = time.time()
+        with self._lock:
+            self._bot_stats(bot_id)["errors"] += 1
+            self._record(bot_id, command, "errors", now)
+            self._dirty = True
+    
+    def record_message(self, bot_id: str):
+        """Count a message seen by a bot (activity series only)"""
+        now = time.time()
+        with self._lock:
+            self._record(bot_id, None, "messages", now)
+    
+    def get_activity(self, bot_id: str, resolution: str = "minute", buckets: Optional[int] = None,
+                     command: Optional[str] = None) -> Dict[str, Any]:
+        """Get recent activity counts, oldest bucket first
+        
+        resolution is "minute" (last 24h), "hour" (7 days) or "day" (90 days).
+        """
+        now = time.time()
+        with self._lock:
+            if command is None:
+                series = self._activity.get(bot_id)
+                metrics = BOT_METRICS
+            else:
+                series = self._command_activity.get((bot_id, command))
+                metrics = COMMAND_METRICS
+            if series is None:
+                series = ActivitySeries(metrics)
+            return series.query(now, resolution, buckets)
+    
+    def record_latency(self, bot_id: str, command: str, seconds: float):
+        """Record how long a command took end to end"""
+        with self._lock:
+            histograms = self._latency.get(bot_id)
+            if histograms is None:
+                histograms = self._latency[bot_id] = {}
+            histogram = histograms.get(command)
+            if histogram is None:
+                histogram = histograms[command] = LatencyHistogram()
+            histogram.record(seconds)
+    
+    def get_latency(self, bot_id: str) -> Dict[str, Any]:
+        """Get latency percentiles of a bot, overall and per command"""
+        with self._lock:
+            histograms = self._latency.get(bot_id, {})
+            return {
+                "overall": LatencyHistogram.merged(histograms.values()).summary(),
+                "commands": {command: histogram.summary() for command, histogram in histograms.items()}
+            }
+    
+    def record_dispatch(self, bot_id: str, guild_id: Optional[str], command: str, user_id: str, channel_id: str):
+        """Feed a dispatched command to the bot's top-K trackers (DMs count as guild "dm")"""
+        now = time.time()
+        with self._lock:
+            guilds = self._top.get(bot_id)
+            if guilds is None:
+                guilds = self._top[bot_id] = {}
+            trackers = guilds.get(guild_id or "dm")
+            if trackers is None:
+                trackers = guilds[guild_id or "dm"] = {
+                    dimension: WindowedTopK(window=TOP_WINDOW) for dimension in TOP_DIMENSIONS
+                }
+            trackers["commands"].add(command, now)
+            trackers["users"].add(user_id, now)
+            trackers["channels"].add(channel_id, now)
+            self._distinct.add(bot_id, guild_id or "dm", command, user_id, date.fromtimestamp(now).isoformat())
+    
+    def get_unique_users(self, bot_id: str, days: int = 1, guild_id: Optional[str] = None,
+                         command: Optional[str] = None) -> Dict[str, Any]:
+        """Estimate unique users over the last `days` days, per day and in total
+        
+        Leave guild_id or command out to count across all guilds or commands.
+        Estimates are within a few percent.
+        """
+        today = date.today()
+        day_list = [(today - timedelta(days=offset)).isoformat() for offset in range(max(days, 1) - 1, -1, -1)]
+        with self._lock:
+            return self._distinct.count(bot_id, day_list, guild_id, command)
+    
+    def get_top(self, bot_id: str, guild_id: Optional[str] = None, limit: int = 20) -> Dict[str, Any]:
+        """Get the top commands, users and channels of the last hour, for one guild or all of them
+        
+        Counts are estimates: the true count lies between count - error and count.
+        """
+        now = time.time()
+        with self._lock:
+            guilds = self._top.get(bot_id, {})
+            selected = [guilds[guild_id]] if guild_id in guilds else [] if guild_id else list(guilds.values())
+            result: Dict[str, Any] = {"guild_id": guild_id, "window_seconds": TOP_WINDOW}
+            for dimension in TOP_DIMENSIONS:
+                sketches = [sketch for trackers in selected for sketch in trackers[dimension].live(now)]
+                result[dimension] = merge_top(sketches, limit)
+            return result
+    
+    def get_bot_histograms(self) -> Dict[str, LatencyHistogram]:
+        """Get each bot's latency histogram, merged over its commands"""
+        with self._lock:
+            return {
+                bot_id: LatencyHistogram.merged(histograms.values())
+                for bot_id, histograms in self._latency.items()
+            }
+    
+    def get_fleet_latency(self) -> Dict[str, Any]:
+        """Get latency percentiles across every bot, overall and per bot"""
+        per_bot = self.get_bot_histograms()
+        return {
+            "overall": LatencyHistogram.merged(per_bot.values()).summary(),
+            "bots": {bot_id: histogram.summary() for bot_id, histogram in per_bot.items()}
+        }
+    
+    def get_counters(self) -> Dict[str, tuple]:
+        """Get (commands_run, errors) of every bot, without formatting anything"""
+        with self._lock:
+            return {bot_id: (stats["commands_run"], stats["errors"]) for bot_id, stats in self._stats.items()}
+    
+    def forget_bot(self, bot_id: str):
+        """Drop a deleted bot's counters and series"""
+        with self._lock:
+            if self._stats.pop(bot_id, None) is not None:
+                self._dirty = True
+            self._last_active.pop(bot_id, None)
+            self._activity.pop(bot_id, None)
+            self._latency.pop(bot_id, None)
+            self._top.pop(bot_id, None)
+            self._distinct.forget_bot(bot_id)
+            for key in [key for key in self._command_activity if key[0] == bot_id]:
+                del self._command_activity[key]
+    
+    def _snapshot(self) -> Dict[str, Any]:
+        """Copy the counters with last_active formatted; caller holds the lock"""
+        for bot_id, timestamp in self._last_active.items():
+            self._bot_stats(bot_id)["last_active"] = datetime.fromtimestamp(timestamp).isoformat()
+        self._last_active.clear()
+        return {
+            bot_id: {key: dict(value) if isinstance(value, dict) else value for key, value in stats.items()}
+            for bot_id, stats in self._stats.items()
+        }
     
     def get_stats(self, bot_id: str) -> Dict[str, Any]:
         """Get bot statistics"""
-        stats = self.db._load_json(self.stats_file)
-        return stats.get(bot_id, {"commands_run": 0, "errors": 0})
+        with self._lock:
+            if bot_id not in self._stats:
+                return {"commands_run": 0, "errors": 0}
+            return self._snapshot()[bot_id]
+    
+    def get_summary(self, bot_id: str, top: int = 5) -> Dict[str, Any]:
+        """Get a bot's totals, recent rates, error ratios and top commands
+        
+        Everything comes from counters kept up to date as commands run, so
+        this costs the same however much history the bot has.
+        """
+        now = time.time()
+        with self._lock:
+            stats = self._stats.get(bot_id, {})
+            commands_run = stats.get("commands_run", 0)
+            errors = stats.get("errors", 0)
+            last_active = self._last_active.get(bot_id)
+            series = self._activity.get(bot_id)
+            
+            def window(resolution, buckets):
+                if series is None:
+                    return {"executions": 0, "errors": 0, "messages": 0, "error_ratio": 0.0}
+                counts = {metric: series.total(metric, now, resolution, buckets) for metric in BOT_METRICS}
+                attempts = counts["executions"] + counts["errors"]
+                counts["error_ratio"] = counts["errors"] / attempts if attempts else 0.0
+                return counts
+            
+            last_5m = window("minute", 5)
+            top_commands = heapq.nlargest(top, stats.get("commands", {}).items(), key=lambda item: item[1])
+            return {
+                "bot_id": bot_id,
+                "commands_run": commands_run,
+                "errors": errors,
+                "error_ratio": errors / (commands_run + errors) if commands_run + errors else 0.0,
+                "last_active": datetime.fromtimestamp(last_active).isoformat() if last_active else stats.get("last_active"),
+                "rate_per_minute": last_5m["executions"] / 5,
+                "last_hour": window("minute", 60),
+                "last_24h": window("hour", 24),
+                "top_commands": [{"command": command, "count": count} for command, count in top_commands]
+            }
     
     def get_all_stats(self) -> Dict[str, Any]:
         """Get all statistics"""
-        return self.db._load_json(self.stats_file)
+        with self._lock:
+            return self._snapshot()
+    
+    def _flush_loop(self):
+        """Write the counters out every flush interval"""
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+    
+    def flush(self) -> bool:
+        """Write the counters to stats.json and the changed unique-user days"""
+        with self._flush_lock:
+            with self._lock:
+                stats = self._snapshot() if self._dirty else None
+                self._dirty = False
+                distinct = self._distinct.take_dirty()
+            ok = True
+            if stats is not None:
+                try:
+                    # Machine-only file, so skip pretty-printing
+                    self.db._save_json(self.stats_file, stats, pretty=False)
+                except Exception as e:
+                    with self._lock:
+                        self._dirty = True
+                    print(f"[Stats] Error saving stats: {e}")
+                    ok = False
+            if distinct:
+                try:
+                    self._distinct.write(distinct)
+                except Exception as e:
+                    with self._lock:
+                        self._distinct.mark_dirty(distinct)
+                    print(f"[Stats] Error saving unique users: {e}")
+                    ok = False
+            return ok
+    
+    def close(self):
+        """Stop the background flush and write the counters one last time"""
+        self._closed.set()
+        self.flush()
@@ -0,0 +1,101 @@
+"""
+Streaming top-K (heavy hitters) with bounded memory
+
+SpaceSaving keeps at most `capacity` counters: an unseen key takes over the
+smallest counter and inherits its count as possible overcount, so any key
+seen more than N / capacity times is guaranteed to be tracked. WindowedTopK
+keeps one sketch per time slice and merges the live slices on query, which
+gives "top keys over the last hour" with memory fixed by slices x capacity
+however many distinct users or channels show up.
+"""
+
+from typing import Dict, Hashable, Iterable, List, Optional
+
+
+class SpaceSaving:
+    """Space-Saving heavy-hitter sketch"""
+    
+    __slots__ = ("capacity", "counts", "errors")
+    
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.counts: Dict[Hashable, int] = {}
+        # Overcount inherited when a key replaced another; the true count is in [count - error, count]
+        self.errors: Dict[Hashable, int] = {}
+    
+    def add(self, key: Hashable, amount: int = 1):
+        counts = self.counts
+        if key in counts:
+            counts[key] += amount
+            return
+        if len(counts) < self.capacity:
+            counts[key] = amount
+            self.errors[key] = 0
+            return
+        victim = min(counts, key=counts.__getitem__)
+        floor = counts.pop(victim)
+        del self.errors[victim]
+        counts[key] = floor + amount
+        self.errors[key] = floor
+    
+    def floor(self) -> int:
+        """Most a key missing from the sketch can have been seen"""
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+
+def merge_top(sketches: Iterable[SpaceSaving], k: int) -> List[Dict[str, int]]:
+    """Top k keys over several sketches, highest count first
+    
+    A key missing from a full sketch may still have up to that sketch's
+    floor there, which is added to its error rather than its count.
+    """
+    sketches = list(sketches)
+    counts: Dict[Hashable, int] = {}
+    errors: Dict[Hashable, int] = {}
+    for sketch in sketches:
+        for key, count in sketch.counts.items():
+            counts[key] = counts.get(key, 0) + count
+            errors[key] = errors.get(key, 0) + sketch.errors[key]
+    floors = [sketch.floor() for sketch in sketches]
+    top = sorted(counts, key=counts.__getitem__, reverse=True)[:k]
+    result = []
+    for key in top:
+        missed = sum(floor for sketch, floor in zip(sketches, floors) if floor and key not in sketch.counts)
+        result.append({"key": key, "count": counts[key], "error": errors[key] + missed})
+    return result
+
+
+class WindowedTopK:
+    """Space-Saving sketches over a sliding window, one per time slice
+    
+    The window moves a slice at a time, so "last hour" with 6 slices covers
+    between 50 and 60 minutes.
+    """
+    
+    __slots__ = ("slice_width", "capacity", "_sketches", "_slice_ids")
+    
+    def __init__(self, window: float = 3600, slices: int = 6, capacity: int = 100):
+        self.slice_width = window / slices
+        self.capacity = capacity
+        self._sketches: List[Optional[SpaceSaving]] = [None] * slices
+        self._slice_ids: List[Optional[int]] = [None] * slices
+    
+    def add(self, key: Hashable, now: float, amount: int = 1):
+        slice_id = int(now // self.slice_width)
+        i = slice_id % len(self._sketches)
+        if self._slice_ids[i] != slice_id:
+            self._sketches[i] = SpaceSaving(self.capacity)
+            self._slice_ids[i] = slice_id
+        self._sketches[i].add(key, amount)
+    
+    def live(self, now: float) -> List[SpaceSaving]:
+        """Sketches of the slices still inside the window"""
+        current = int(now // self.slice_width)
+        oldest = current - len(self._sketches) + 1
+        return [
+            sketch for sketch, slice_id in zip(self._sketches, self._slice_ids)
+            if slice_id is not None and oldest <= slice_id <= current
+        ]
+    
+    def top(self, k: int, now: float) -> List[Dict[str, int]]:
+        return merge_top(self.live(now), k)
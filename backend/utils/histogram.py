@@ -0,0 +1,92 @@
+"""
+Log-bucketed latency histograms
+
+Bucket i covers [MIN_VALUE * GROWTH**i, MIN_VALUE * GROWTH**(i+1)), so every
+histogram has the same fixed layout: constant memory whatever the number of
+samples, a bounded relative error (about 4.5% with 8 buckets per doubling)
+and merging by adding the bucket arrays, which is how per-command values
+roll up into per-bot and fleet-wide percentiles.
+"""
+
+import math
+from array import array
+from typing import Dict, Iterable, Optional
+
+
+MIN_VALUE = 1e-5    # 10 us; anything faster lands in the first bucket
+MAX_VALUE = 600.0   # 10 min; anything slower lands in the last bucket
+BUCKETS_PER_DOUBLING = 8
+GROWTH = 2 ** (1 / BUCKETS_PER_DOUBLING)
+BUCKETS = math.ceil(math.log2(MAX_VALUE / MIN_VALUE) * BUCKETS_PER_DOUBLING) + 1
+_SCALE = BUCKETS_PER_DOUBLING / math.log(2)
+
+
+class LatencyHistogram:
+    """Constant-memory, mergeable histogram of durations in seconds"""
+    
+    __slots__ = ("_counts", "count", "total", "max")
+    
+    def __init__(self):
+        self._counts = array('Q', bytes(8 * BUCKETS))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    @staticmethod
+    def _bucket(value: float) -> int:
+        if value <= MIN_VALUE:
+            return 0
+        return min(int(math.log(value / MIN_VALUE) * _SCALE), BUCKETS - 1)
+    
+    def record(self, seconds: float):
+        """Add one duration"""
+        self._counts[self._bucket(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+    
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        """Add another histogram's samples into this one"""
+        counts = self._counts
+        for i, n in enumerate(other._counts):
+            if n:
+                counts[i] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        return self
+    
+    @classmethod
+    def merged(cls, histograms: Iterable["LatencyHistogram"]) -> "LatencyHistogram":
+        """Build a new histogram holding the samples of all the given ones"""
+        result = cls()
+        for histogram in histograms:
+            result.merge(histogram)
+        return result
+    
+    def percentile(self, q: float) -> Optional[float]:
+        """Estimate the q-th percentile (0-100); None when empty"""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * q / 100))
+        seen = 0
+        for i, n in enumerate(self._counts):
+            seen += n
+            if seen >= rank:
+                # Geometric middle of the bucket, never above the real maximum
+                return min(MIN_VALUE * GROWTH ** (i + 0.5), self.max)
+        return self.max
+    
+    def summary(self) -> Dict[str, Optional[float]]:
+        """Count, mean and p50/p90/p99/max in milliseconds"""
+        def ms(value):
+            return None if value is None else round(value * 1000, 3)
+        return {
+            "count": self.count,
+            "mean_ms": ms(self.total / self.count) if self.count else None,
+            "p50_ms": ms(self.percentile(50)),
+            "p90_ms": ms(self.percentile(90)),
+            "p99_ms": ms(self.percentile(99)),
+            "max_ms": ms(self.max) if self.count else None
+        }
@@ -0,0 +1,122 @@
+"""
+HyperLogLog distinct counting
+
+Estimates how many different items were added using 2**p one-byte
+registers (4 KB at the default p=12, about 1.6% standard error) instead of
+storing the items. Small sketches stay sparse (only the registers that are
+set), sketches merge by taking the register-wise maximum, and the binary
+form is what gets persisted. Items are hashed with blake2b so sketches
+written by one process can be merged by another.
+"""
+
+import hashlib
+import math
+import struct
+from typing import Dict, Iterable, Optional
+
+PRECISION = 12
+_SPARSE = b"S"
+_DENSE = b"D"
+_SPARSE_ENTRY = struct.Struct("<HB")
+
+
+def _hash(item: str) -> int:
+    return int.from_bytes(hashlib.blake2b(item.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class HyperLogLog:
+    """Mergeable approximate distinct counter"""
+    
+    __slots__ = ("p", "m", "_sparse", "_registers")
+    
+    def __init__(self, p: int = PRECISION):
+        self.p = p
+        self.m = 1 << p
+        # register -> rank while few registers are set, then a dense bytearray
+        self._sparse: Optional[Dict[int, int]] = {}
+        self._registers: Optional[bytearray] = None
+    
+    def _set(self, index: int, rank: int):
+        if self._registers is not None:
+            if rank > self._registers[index]:
+                self._registers[index] = rank
+            return
+        if rank > self._sparse.get(index, 0):
+            self._sparse[index] = rank
+            # Past this size a dict costs more memory than the dense registers
+            if len(self._sparse) > self.m // 64:
+                self._densify()
+    
+    def _densify(self):
+        registers = bytearray(self.m)
+        for index, rank in self._sparse.items():
+            registers[index] = rank
+        self._registers = registers
+        self._sparse = None
+    
+    def add(self, item: str):
+        h = _hash(item)
+        bits = 64 - self.p
+        rest = h & ((1 << bits) - 1)
+        self._set(h >> bits, bits - rest.bit_length() + 1)
+    
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Fold another sketch of the same precision into this one"""
+        if other.p != self.p:
+            raise ValueError("Cannot merge sketches of different precision")
+        if other._registers is None:
+            for index, rank in other._sparse.items():
+                self._set(index, rank)
+            return self
+        if self._registers is None:
+            self._densify()
+        self._registers = bytearray(map(max, self._registers, other._registers))
+        return self
+    
+    @classmethod
+    def merged(cls, sketches: Iterable["HyperLogLog"], p: int = PRECISION) -> "HyperLogLog":
+        result = cls(p)
+        for sketch in sketches:
+            result.merge(sketch)
+        return result
+    
+    def count(self) -> int:
+        """Estimated number of distinct items added"""
+        m = self.m
+        if self._registers is None:
+            ranks = self._sparse.values()
+            zeros = m - len(self._sparse)
+        else:
+            ranks = self._registers
+            zeros = self._registers.count(0)
+        if zeros == m:
+            return 0
+        harmonic = zeros + sum(2.0 ** -rank for rank in ranks if rank)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / harmonic
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate while many registers are empty
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+    
+    def to_bytes(self) -> bytes:
+        """Compact binary form: set registers only while that is smaller"""
+        header = bytes([self.p])
+        if self._registers is None:
+            entries = b"".join(_SPARSE_ENTRY.pack(index, rank) for index, rank in sorted(self._sparse.items()))
+            return _SPARSE + header + entries
+        return _DENSE + header + bytes(self._registers)
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        kind, p = data[:1], data[1]
+        sketch = cls(p)
+        if kind == _SPARSE:
+            for index, rank in _SPARSE_ENTRY.iter_unpack(data[2:]):
+                sketch._set(index, rank)
+        elif kind == _DENSE and len(data) == 2 + sketch.m:
+            sketch._sparse = None
+            sketch._registers = bytearray(data[2:])
+        else:
+            raise ValueError("Corrupt HyperLogLog sketch")
+        return sketch
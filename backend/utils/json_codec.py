@@ -0,0 +1,74 @@
+"""
+JSON codec for Far-Bot storage files
+
+Uses orjson or ujson when one is installed and falls back to the standard
+library otherwise. Files are always read and written as UTF-8 bytes so every
+codec produces interchangeable output. Pretty output (2-space indent) is kept
+for files people open by hand; machine-only files are written compact.
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+class JSONCodec:
+    """Encode and decode JSON with a selectable implementation"""
+    
+    def __init__(self, name: str = "auto"):
+        if name == "auto":
+            name = "orjson" if orjson else "ujson" if ujson else "json"
+        if name == "orjson" and not orjson:
+            raise ImportError("orjson is not installed")
+        if name == "ujson" and not ujson:
+            raise ImportError("ujson is not installed")
+        if name not in ("orjson", "ujson", "json"):
+            raise ValueError(f"Unknown JSON codec: {name}")
+        self.name = name
+    
+    def loads(self, data: Union[str, bytes]) -> Any:
+        """Decode a JSON document"""
+        if self.name == "orjson":
+            return orjson.loads(data)
+        if self.name == "ujson":
+            return ujson.loads(data)
+        return json.loads(data)
+    
+    def dumps(self, obj: Any, pretty: bool = False) -> bytes:
+        """Encode an object as UTF-8 JSON"""
+        if self.name == "orjson":
+            option = orjson.OPT_NON_STR_KEYS
+            if pretty:
+                option |= orjson.OPT_INDENT_2
+            return orjson.dumps(obj, option=option)
+        if self.name == "ujson":
+            if pretty:
+                return ujson.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+            return ujson.dumps(obj, ensure_ascii=False).encode('utf-8')
+        if pretty:
+            return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    
+    def load_file(self, file_path: Union[str, Path]) -> Any:
+        """Read and decode a JSON file"""
+        with open(file_path, 'rb') as f:
+            return self.loads(f.read())
+    
+    def dump_file(self, file_path: Union[str, Path], obj: Any, pretty: bool = True):
+        """Encode and write a JSON file"""
+        with open(file_path, 'wb') as f:
+            f.write(self.dumps(obj, pretty=pretty))
+
+
+# Shared instance used across the backend
+codec = JSONCodec()
@@ -0,0 +1,74 @@
+"""
+Compiled response templates for simple commands
+
+A response such as "Hola $username! Bienvenido a $servername" is tokenized
+once into a list of literal strings and variable slots, so rendering is a
+single join instead of one str.replace pass per known variable. Variables
+are matched longest name first, which keeps $user from eating the start of
+$username or $userid. Besides named variables there are two parametric
+forms: $random(min,max) and $argN (1-based command argument).
+"""
+
+import random
+import re
+from typing import Dict, Iterable, List, Sequence, Tuple, Union
+
+# Slot kinds
+VAR = "var"
+ARG = "arg"
+RANDOM = "random"
+
+Segment = Union[str, Tuple]
+
+
+class Template:
+    """A response split into literals and variable slots"""
+    
+    __slots__ = ("source", "segments", "names", "uses_args", "static")
+    
+    def __init__(self, source: str, segments: List[Segment]):
+        self.source = source
+        self.segments = segments
+        # Named variables the template uses, so callers only compute those
+        self.names = frozenset(seg[1] for seg in segments if type(seg) is tuple and seg[0] == VAR)
+        self.uses_args = any(type(seg) is tuple and seg[0] == ARG for seg in segments)
+        self.static = all(type(seg) is str for seg in segments)
+    
+    def render(self, values: Dict[str, str], args: Sequence[str] = ()) -> str:
+        """Fill the slots: named variables from `values`, $argN from `args`"""
+        if self.static:
+            return self.source
+        parts = []
+        for seg in self.segments:
+            if type(seg) is str:
+                parts.append(seg)
+            elif seg[0] == VAR:
+                parts.append(values[seg[1]])
+            elif seg[0] == ARG:
+                parts.append(args[seg[1]] if seg[1] < len(args) else '')
+            else:
+                parts.append(str(random.randint(seg[1], seg[2])))
+        return ''.join(parts)
+
+
+def compile_template(source: str, variables: Iterable[str]) -> Template:
+    """Tokenize `source` against the given variable names"""
+    names = '|'.join(re.escape(name) for name in sorted(variables, key=len, reverse=True))
+    pattern = re.compile(r'\$(?:random\(\s*(\d+)\s*,\s*(\d+)\s*\)|arg([1-9]\d*)|(' + (names or '(?!)') + '))')
+    segments: List[Segment] = []
+    pos = 0
+    for match in pattern.finditer(source):
+        if match.start() > pos:
+            segments.append(source[pos:match.start()])
+        pos = match.end()
+        low, high, arg, name = match.groups()
+        if name is not None:
+            segments.append((VAR, name))
+        elif arg is not None:
+            segments.append((ARG, int(arg) - 1))
+        else:
+            low, high = sorted((int(low), int(high)))
+            segments.append((RANDOM, low, high))
+    if pos < len(source):
+        segments.append(source[pos:])
+    return Template(source, segments)
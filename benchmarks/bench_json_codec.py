@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark the JSON codecs on realistic command catalogs
+
+Generates catalogs shaped like data/commands/<bot_id>.json (a mix of simple,
+advanced and slash commands) and times parse, pretty dump and compact dump
+for every codec available on this machine.
+
+Usage: python benchmarks/bench_json_codec.py [--sizes 1000 10000 50000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.utils.json_codec import JSONCodec
+
+
+ADVANCED_CODE = '''@bot.command(name='{name}')
+async def {name}_command(ctx, *, texto: str = None):
+    """Comando generado para el benchmark"""
+    if texto is None:
+        await ctx.send("Por favor escribe algo!")
+        return
+    await ctx.send(f"{{ctx.author.mention}} dijo: {{texto}}")
+'''
+
+
+def make_catalog(size: int, seed: int = 42) -> dict:
+    """Build a catalog of `size` commands with a realistic type mix"""
+    rng = random.Random(seed)
+    catalog = {}
+    for i in range(size):
+        cmd_id = f"cmd_{i}"
+        roll = rng.random()
+        if roll < 0.7:
+            cmd_type = "simple"
+            response = "Hola $username! 👋 Bienvenido a **$servername** " * rng.randint(1, 4)
+            code = ""
+        else:
+            cmd_type = "advanced" if roll < 0.9 else "slash"
+            response = ""
+            code = ADVANCED_CODE.format(name=cmd_id)
+        catalog[cmd_id] = {
+            "id": cmd_id,
+            "type": cmd_type,
+            "trigger": cmd_id,
+            "response": response,
+            "code": code,
+            "description": f"Comando de prueba numero {i}",
+            "enabled": rng.random() > 0.1,
+            "usage_count": rng.randint(0, 100000)
+        }
+    return catalog
+
+
+def best_of(func, repeat: int) -> float:
+    """Best wall time of `repeat` runs, in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def available_codecs() -> list:
+    codecs = []
+    for name in ("json", "ujson", "orjson"):
+        try:
+            codecs.append(JSONCodec(name))
+        except ImportError:
+            pass
+    return codecs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Far-Bot JSON codecs")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    
+    codecs = available_codecs()
+    print(f"Codecs: {', '.join(c.name for c in codecs)}\n")
+    print(f"{'commands':>9} {'codec':>7} {'size KB':>9} {'parse ms':>9} {'pretty ms':>10} {'compact ms':>11}")
+    
+    for size in args.sizes:
+        catalog = make_catalog(size)
+        baseline = None
+        for codec in codecs:
+            pretty = codec.dumps(catalog, pretty=True)
+            parse_ms = best_of(lambda: codec.loads(pretty), args.repeat)
+            pretty_ms = best_of(lambda: codec.dumps(catalog, pretty=True), args.repeat)
+            compact_ms = best_of(lambda: codec.dumps(catalog), args.repeat)
+            line = f"{size:>9} {codec.name:>7} {len(pretty) / 1024:>9.0f} {parse_ms:>9.2f} {pretty_ms:>10.2f} {compact_ms:>11.2f}"
+            if baseline is None:
+                baseline = parse_ms + pretty_ms
+            else:
+                line += f"   {baseline / (parse_ms + pretty_ms):.1f}x vs json"
+            print(line)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Benchmark DatabaseManager storage modes and AutoMod guild configs
+
+Generates a synthetic fleet (N bots x M commands x G guild configs) in a
+temporary directory and times add, get, update and delete for every storage
+mode, plus a cold start that reloads every catalog. Each operation reports
+throughput and p50/p99 latency; --output writes the same numbers as JSON so
+runs can be compared against a saved baseline.
+
+Usage: python benchmarks/bench_storage.py [--bots 20] [--commands 200] [--guilds 5]
+                                          [--modes json sqlite] [--output report.json]
+"""
+
+import argparse
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.database import DatabaseManager
+from backend.utils.json_codec import codec
+
+
+# Storage modes: the "database" section written to config.json
+MODES = {
+    "json": {"type": "json"},
+    "json-coalesced": {"type": "json", "flush_interval_ms": 50},
+    "json-snapshots": {"type": "json", "snapshots": True},
+    "json-shared": {"type": "json", "shared": True},
+    "journal": {"type": "json", "journal": True},
+    "sqlite": {"type": "sqlite"},
+}
+
+
+def make_command(rng: random.Random, i: int) -> dict:
+    """Build a command with the same shape the panel creates"""
+    cmd_id = f"cmd_{i}"
+    simple = rng.random() < 0.7
+    return {
+        "id": cmd_id,
+        "type": "simple" if simple else "advanced",
+        "trigger": cmd_id,
+        "response": "Hola $username! Bienvenido a **$servername** " * rng.randint(1, 3) if simple else "",
+        "code": "" if simple else f"@bot.command(name='{cmd_id}')\nasync def c(ctx):\n    await ctx.send('ok')\n",
+        "description": f"Comando de prueba {i}",
+        "enabled": True
+    }
+
+
+def summarize(samples: list) -> dict:
+    """Throughput and latency percentiles for a list of per-op durations in seconds"""
+    if not samples:
+        return {"ops": 0}
+    ordered = sorted(samples)
+    total = sum(ordered)
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1e6
+    return {
+        "ops": len(ordered),
+        "ops_per_sec": len(ordered) / total if total else float('inf'),
+        "p50_us": pct(0.50),
+        "p99_us": pct(0.99),
+        "max_us": ordered[-1] * 1e6
+    }
+
+
+def timed(samples: list, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    samples.append(time.perf_counter() - start)
+    return result
+
+
+def bench_mode(settings: dict, bots: int, commands: int, seed: int) -> dict:
+    """Run the command workload against one storage mode"""
+    rng = random.Random(seed)
+    data_dir = tempfile.mkdtemp(prefix="far-bot-bench-")
+    try:
+        with open(os.path.join(data_dir, "config.json"), 'wb') as f:
+            f.write(codec.dumps({"version": "1.0.0", "database": settings}, pretty=True))
+        db = DatabaseManager(data_dir)
+        bot_ids = [f"bot_{b}" for b in range(bots)]
+        cmd_ids = [f"cmd_{i}" for i in range(commands)]
+        results = {}
+        
+        samples = []
+        for bot_id in bot_ids:
+            timed(samples, db.add_bot, bot_id, {"name": bot_id, "prefix": "!"})
+        results["add_bot"] = summarize(samples)
+        
+        samples = []
+        for bot_id in bot_ids:
+            for i in range(commands):
+                timed(samples, db.add_command, bot_id, cmd_ids[i], make_command(rng, i))
+        results["add_command"] = summarize(samples)
+        
+        samples = []
+        for bot_id in bot_ids:
+            start = time.perf_counter()
+            with db.batch(bot_id) as tx:
+                for i in range(commands):
+                    tx.update_command(cmd_ids[i], {"description": "lote"})
+            samples.append((time.perf_counter() - start) / commands)
+        results["batch_update_per_command"] = summarize(samples)
+        
+        samples = []
+        for _ in range(bots * commands):
+            timed(samples, db.get_command, rng.choice(bot_ids), rng.choice(cmd_ids))
+        results["get_command"] = summarize(samples)
+        
+        samples = []
+        for bot_id in bot_ids:
+            timed(samples, db.get_commands, bot_id)
+        results["get_commands"] = summarize(samples)
+        
+        samples = []
+        for _ in range(bots * commands):
+            timed(samples, db.update_command, rng.choice(bot_ids), rng.choice(cmd_ids), {"enabled": rng.random() > 0.5})
+        results["update_command"] = summarize(samples)
+        
+        samples = []
+        timed(samples, db.close)
+        results["close"] = summarize(samples)
+        
+        # Cold start: a fresh manager loading every catalog, as at launch
+        samples = []
+        db = timed(samples, DatabaseManager, data_dir)
+        for bot_id in bot_ids:
+            timed(samples, db.get_commands, bot_id)
+        results["cold_start"] = summarize(samples)
+        
+        samples = []
+        for bot_id in bot_ids:
+            for cmd_id in rng.sample(cmd_ids, len(cmd_ids) // 2):
+                timed(samples, db.delete_command, bot_id, cmd_id)
+        results["delete_command"] = summarize(samples)
+        
+        results["cache"] = db.get_cache_stats()
+        db.close()
+        return results
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def bench_automod(bots: int, guilds: int, seed: int) -> dict:
+    """Run get_config/save_config/update_config over every guild config"""
+    try:
+        from backend.automod import AutoModManager
+    except ImportError as e:
+        return {"skipped": f"AutoMod unavailable: {e}"}
+    
+    rng = random.Random(seed)
+    data_dir = tempfile.mkdtemp(prefix="far-bot-bench-")
+    try:
+        automod = AutoModManager(data_dir)
+        pairs = [(f"bot_{b}", str(100000 + g)) for b in range(bots) for g in range(guilds)]
+        results = {}
+        
+        samples = []
+        for bot_id, guild_id in pairs:
+            config = automod.get_config(bot_id, guild_id)
+            config["welcome"] = {**config["welcome"], "enabled": True, "message": "Hola $user"}
+            timed(samples, automod.save_config, bot_id, guild_id, config)
+        results["save_config"] = summarize(samples)
+        
+        samples = []
+        for _ in range(len(pairs) * 5):
+            timed(samples, automod.get_config, *rng.choice(pairs))
+        results["get_config"] = summarize(samples)
+        
+        samples = []
+        for _ in range(len(pairs)):
+            bot_id, guild_id = rng.choice(pairs)
+            timed(samples, automod.update_config, bot_id, guild_id, "goodbye", {"enabled": True})
+        results["update_config"] = summarize(samples)
+        return results
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def print_table(title: str, results: dict):
+    print(f"\n== {title} ==")
+    if "skipped" in results:
+        print(f"  {results['skipped']}")
+        return
+    print(f"  {'operation':<26} {'ops':>8} {'ops/s':>12} {'p50 us':>10} {'p99 us':>10}")
+    for op, stats in results.items():
+        if op == "cache" or not stats.get("ops"):
+            continue
+        print(f"  {op:<26} {stats['ops']:>8} {stats['ops_per_sec']:>12.0f} {stats['p50_us']:>10.1f} {stats['p99_us']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Far-Bot storage modes")
+    parser.add_argument("--bots", type=int, default=20)
+    parser.add_argument("--commands", type=int, default=200)
+    parser.add_argument("--guilds", type=int, default=5)
+    parser.add_argument("--modes", nargs="+", choices=sorted(MODES), default=list(MODES))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    args = parser.parse_args()
+    
+    report = {
+        "generated_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "codec": codec.name,
+        "fleet": {"bots": args.bots, "commands": args.commands, "guilds": args.guilds},
+        "modes": {},
+        "automod": {}
+    }
+    
+    for mode in args.modes:
+        report["modes"][mode] = bench_mode(MODES[mode], args.bots, args.commands, args.seed)
+        print_table(f"{mode} ({args.bots} bots x {args.commands} commands)", report["modes"][mode])
+    
+    report["automod"] = bench_automod(args.bots, args.guilds, args.seed)
+    print_table(f"automod ({args.bots} bots x {args.guilds} guilds)", report["automod"])
+    
+    if args.output:
+        with open(args.output, 'wb') as f:
+            f.write(codec.dumps(report, pretty=True))
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark simple command response rendering
+
+Compares the old rendering (one str.replace pass per known variable, plus
+a regex and an argument split on every call) with the compiled templates
+CommandBuilder now builds at registration. Responses range from plain text
+to the variable-heavy greetings the panel examples use; the context is a
+stand-in with the attributes the variables read.
+
+Usage: python benchmarks/bench_templates.py [--repeat 5] [--number 20000]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.command_executor import CommandExecutor
+
+
+RESPONSES = {
+    "plain": "Pong!",
+    "greeting": "Hola $username! Bienvenido a **$servername**",
+    "dice": "🎲 $username saco un $random(1,6)!",
+    "args": "$mention dijo: $args",
+    "heavy": "Hola $displayname ($userid) en #$channel de $servername ($membercount miembros). "
+             "Soy $botname, prefijo $prefix. Hoy es $day $date a las $time. " * 3,
+}
+
+
+def make_context():
+    """Stand-in for a discord.py Context with the attributes variables read"""
+    author = SimpleNamespace(name="ana", id=123456789012345678, mention="<@123456789012345678>",
+                             discriminator="0", avatar=None, display_name="Ana")
+    guild = SimpleNamespace(name="Far-Bot Lab", id=987654321098765432, member_count=1234, icon=None)
+    channel = SimpleNamespace(name="general", id=555555555555555555, mention="<#555555555555555555>")
+    bot = SimpleNamespace(user=SimpleNamespace(name="FarBot", id=111111111111111111, mention="<@111111111111111111>"))
+    message = SimpleNamespace(content="!cmd hola mundo desde el benchmark")
+    return SimpleNamespace(author=author, guild=guild, channel=channel, bot=bot, prefix="!", message=message)
+
+
+def legacy_render(ctx, response: str) -> str:
+    """The str.replace chain execute_simple_command used before templates"""
+    result = response
+    result = result.replace('$username', ctx.author.name)
+    result = result.replace('$user', ctx.author.name)
+    result = result.replace('$userid', str(ctx.author.id))
+    result = result.replace('$mention', ctx.author.mention)
+    result = result.replace('$usermention', ctx.author.mention)
+    result = result.replace('$discriminator', ctx.author.discriminator)
+    result = result.replace('$avatar', str(ctx.author.avatar.url if ctx.author.avatar else ''))
+    result = result.replace('$displayname', ctx.author.display_name)
+    if ctx.guild:
+        result = result.replace('$servername', ctx.guild.name)
+        result = result.replace('$server', ctx.guild.name)
+        result = result.replace('$serverid', str(ctx.guild.id))
+        result = result.replace('$membercount', str(ctx.guild.member_count))
+        result = result.replace('$members', str(ctx.guild.member_count))
+        result = result.replace('$servericon', str(ctx.guild.icon.url if ctx.guild.icon else ''))
+    result = result.replace('$channel', ctx.channel.name if hasattr(ctx.channel, 'name') else 'DM')
+    result = result.replace('$channelid', str(ctx.channel.id))
+    result = result.replace('$channelmention', ctx.channel.mention if hasattr(ctx.channel, 'mention') else 'DM')
+    result = result.replace('$botname', ctx.bot.user.name)
+    result = result.replace('$bot', ctx.bot.user.name)
+    result = result.replace('$botmention', ctx.bot.user.mention)
+    result = result.replace('$botid', str(ctx.bot.user.id))
+    result = result.replace('$prefix', ctx.prefix)
+    now = datetime.now()
+    result = result.replace('$time', now.strftime('%H:%M:%S'))
+    result = result.replace('$date', now.strftime('%Y-%m-%d'))
+    result = result.replace('$datetime', now.strftime('%Y-%m-%d %H:%M:%S'))
+    result = result.replace('$day', now.strftime('%A'))
+    result = result.replace('$month', now.strftime('%B'))
+    result = result.replace('$year', str(now.year))
+    result = re.sub(r'\$random\((\d+),(\d+)\)',
+                    lambda m: str(random.randint(int(m.group(1)), int(m.group(2)))),
+                    result)
+    result = result.replace('$random', str(random.randint(1, 100)))
+    args = ctx.message.content.split()[1:]
+    result = result.replace('$args', ' '.join(args))
+    for i, arg in enumerate(args):
+        result = result.replace(f'$arg{i+1}', arg)
+    return result
+
+
+def best_of(func, repeat: int, number: int) -> float:
+    """Best time per call over `repeat` runs of `number` calls, in microseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return best / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark simple command response rendering")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+    
+    executor = CommandExecutor()
+    ctx = make_context()
+    
+    print(f"{'response':>9} {'chars':>6} {'compile us':>11} {'replace us':>11} {'compiled us':>12} {'speedup':>8}")
+    for name, response in RESPONSES.items():
+        compile_us = best_of(lambda: executor.compile_response(response), args.repeat, max(1, args.number // 10))
+        template = executor.compile_response(response)
+        legacy_us = best_of(lambda: legacy_render(ctx, response), args.repeat, args.number)
+        compiled_us = best_of(lambda: executor.render_response(ctx, template), args.repeat, args.number)
+        print(f"{name:>9} {len(response):>6} {compile_us:>11.2f} {legacy_us:>11.2f} {compiled_us:>12.2f} "
+              f"{legacy_us / compiled_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
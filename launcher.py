@@ -75,15 +75,16 @@ def check_database():
     
     # Check files
     bots_file = db_path / "bots.json"
-    commands_file = db_path / "commands.json"
+    commands_path = db_path / "commands"
     
     if not bots_file.exists():
         bots_file.write_text('{}')
         print("[✓] Created: data/bots.json")
     
-    if not commands_file.exists():
-        commands_file.write_text('{}')
-        print("[✓] Created: data/commands.json")
+    # Commands live in one file per bot; a legacy commands.json is migrated on startup
+    if not commands_path.exists() and not (db_path / "commands.json").exists():
+        commands_path.mkdir()
+        print("[✓] Created: data/commands/")
 
 def load_modules():
     """Load Far-Bot modules"""
@@ -135,10 +136,16 @@ def main():
     
     # Initialize components
     print("\n[*] Initializing Far-Bot...")
-    db = DatabaseManager(db_path="data")
-    bot_manager = BotManager(db)
+    from backend.database import StoreInUse
+    try:
+        db = DatabaseManager(db_path="data")
+    except StoreInUse as e:
+        # Another Far-Bot already runs on this data directory
+        print(f"[✗] {e}")
+        sys.exit(1)
     logger = FarBotLogger(log_dir="logs")
-    api_server = APIServer(db, bot_manager, port=5000)
+    bot_manager = BotManager(db, logger=logger)
+    api_server = APIServer(db, bot_manager, port=5000, logger=logger)
     
     print("[✓] Initialization complete")
     
@@ -161,11 +168,18 @@ def main():
     except KeyboardInterrupt:
         print("\n\n[*] Shutting down Far-Bot...")
         logger.info("Far-Bot shutdown")
+        # Persist any writes still waiting in the flush window
+        bot_manager.stats.close()
+        db.flush()
+        db.close()
         print("[✓] Goodbye!")
         sys.exit(0)
     except Exception as e:
         print(f"\n[✗] Error: {e}")
         logger.error(f"Fatal error: {e}")
+        bot_manager.stats.close()
+        db.flush()
+        db.close()
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -10,11 +10,11 @@ class APIClient {
       const url = endpoint.startsWith("http") ? endpoint : `${this.baseURL}${endpoint}`
 
       const response = await fetch(url, {
+        ...options,
         headers: {
           "Content-Type": "application/json",
           ...options.headers,
         },
-        ...options,
       })
 
       const contentType = response.headers.get("content-type")
@@ -28,7 +28,11 @@ class APIClient {
 
       if (!response.ok) {
         const errorMsg = typeof data === "object" ? data.error : data
-        throw new Error(errorMsg || `HTTP ${response.status}`)
+        const error = new Error(errorMsg || `HTTP ${response.status}`)
+        error.status = response.status
+        // 412: someone else saved first; currentVersion lets the caller reload and retry
+        if (typeof data === "object" && "current_version" in data) error.currentVersion = data.current_version
+        throw error
       }
 
       return data
@@ -54,9 +58,10 @@ class APIClient {
     })
   }
 
-  async updateBot(botId, updates) {
+  async updateBot(botId, updates, version = null) {
     return this.request(`/api/bots/${encodeURIComponent(botId)}`, {
       method: "PUT",
+      headers: version != null ? { "If-Match": `"${version}"` } : {},
       body: JSON.stringify(updates),
     })
   }
@@ -103,16 +108,19 @@ class APIClient {
     return this.addCommand(botId, commandData)
   }
 
-  async updateCommand(botId, commandId, updates) {
+  // Pass the version the editor loaded to get a 412 instead of overwriting someone else's save
+  async updateCommand(botId, commandId, updates, version = null) {
     return this.request(`/api/bots/${encodeURIComponent(botId)}/commands/${encodeURIComponent(commandId)}`, {
       method: "PUT",
+      headers: version != null ? { "If-Match": `"${version}"` } : {},
       body: JSON.stringify(updates),
     })
   }
 
-  async deleteCommand(botId, commandId) {
+  async deleteCommand(botId, commandId, version = null) {
     return this.request(`/api/bots/${encodeURIComponent(botId)}/commands/${encodeURIComponent(commandId)}`, {
       method: "DELETE",
+      headers: version != null ? { "If-Match": `"${version}"` } : {},
     })
   }
 
@@ -123,6 +131,13 @@ class APIClient {
     })
   }
 
+  // Changes since a revision; refetch everything when `full` is true
+  async getChanges(botId, since = 0, epoch = null) {
+    const params = new URLSearchParams({ since })
+    if (epoch) params.set("epoch", epoch)
+    return this.request(`/api/bots/${encodeURIComponent(botId)}/changes?${params}`)
+  }
+
   async syncSlashCommands(botId) {
     return this.request(`/api/bots/${encodeURIComponent(botId)}/sync-commands`, {
       method: "POST",